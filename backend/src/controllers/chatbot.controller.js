@@ -381,6 +381,7 @@ const getGroupProgressSummary = asyncHandler(async (req, res) => {
   const toPercent = count => (total === 0 ? 0 : Math.round((count * 10000) / total) / 100);
 
   const summary = {
+    groupId: currentGroupId.toString(),
     totalTasks: total,
     todo: {
       count: countByStatus.todo,
@@ -468,6 +469,7 @@ const getMemberProgressSummary = asyncHandler(async (req, res) => {
   const toPercent = count => (total === 0 ? 0 : Math.round((count * 10000) / total) / 100);
 
   const summary = {
+    groupId: currentGroupId.toString(),
     totalTasks: total,
     todo: {
       count: countByStatus.todo,
@@ -0,0 +1,174 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+from config import (
+    CHATBOT_ADMISSION_MAX_CONCURRENT,
+    CHATBOT_ADMISSION_QUEUE_SIZE,
+    CHATBOT_ADMISSION_QUEUE_TIMEOUT,
+    CHATBOT_RATE_LIMIT_BURST,
+    CHATBOT_RATE_LIMIT_PER_SECOND,
+)
+
+"""
+Admission control cho /predict trong mỗi worker.
+
+- Rate limit theo user: token bucket theo hash của token (request không có token thì bỏ qua).
+- Giới hạn số request xử lý đồng thời; request vượt quá được chờ trong hàng đợi ngắn
+  (tối đa CHATBOT_ADMISSION_QUEUE_SIZE request, mỗi request chờ tối đa
+  CHATBOT_ADMISSION_QUEUE_TIMEOUT giây), đầy hoặc hết thời gian chờ thì từ chối ngay.
+
+Request bị từ chối nhận AdmissionRejected kèm retry_after (giây) để trả 429 + Retry-After.
+"""
+
+
+class AdmissionRejected(Exception):
+    """Request bị từ chối do vượt rate limit hoặc server đang quá tải."""
+
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(int(math.ceil(self.retry_after)), 1))
+
+
+class TokenBucketLimiter:
+    """Token bucket theo key, số key giữ trong bộ nhớ có giới hạn (LRU)."""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 10000) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # key -> (số token còn lại, thời điểm cập nhật)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, key: str) -> Tuple[bool, float]:
+        """Lấy 1 token cho key. Trả về (được phép, số giây cần chờ nếu bị từ chối)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+        if allowed:
+            return True, 0.0
+        return False, (1 - tokens) / self.rate
+
+
+class ConcurrencyLimiter:
+    """Giới hạn số request đồng thời, có hàng đợi chờ ngắn và giới hạn độ dài."""
+
+    def __init__(self, max_concurrent: int, queue_size: int, queue_timeout: float) -> None:
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._in_flight = 0
+        self._rejected = 0
+
+    def acquire(self) -> None:
+        if self._slots.acquire(blocking=False):
+            self._enter()
+            return
+
+        with self._lock:
+            if self._waiting >= self.queue_size:
+                self._rejected += 1
+                raise AdmissionRejected("server busy", self.queue_timeout)
+            self._waiting += 1
+        try:
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+        if not acquired:
+            with self._lock:
+                self._rejected += 1
+            raise AdmissionRejected("server busy", self.queue_timeout)
+        self._enter()
+
+    def _enter(self) -> None:
+        with self._lock:
+            self._in_flight += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "max_concurrent": self.max_concurrent,
+                "rejected": self._rejected,
+            }
+
+
+rate_limiter: Optional[TokenBucketLimiter] = (
+    TokenBucketLimiter(CHATBOT_RATE_LIMIT_PER_SECOND, CHATBOT_RATE_LIMIT_BURST)
+    if CHATBOT_RATE_LIMIT_PER_SECOND > 0 else None
+)
+concurrency_limiter: Optional[ConcurrencyLimiter] = (
+    ConcurrencyLimiter(
+        CHATBOT_ADMISSION_MAX_CONCURRENT,
+        CHATBOT_ADMISSION_QUEUE_SIZE,
+        CHATBOT_ADMISSION_QUEUE_TIMEOUT,
+    )
+    if CHATBOT_ADMISSION_MAX_CONCURRENT > 0 else None
+)
+_rate_limited = 0
+_rate_limited_lock = threading.Lock()
+
+
+def check_rate_limit(key: Optional[str]) -> None:
+    """Raise AdmissionRejected nếu key đã vượt rate limit (key None: không giới hạn theo user)."""
+    global _rate_limited
+
+    if rate_limiter is None or key is None:
+        return
+    allowed, retry_after = rate_limiter.try_acquire(key)
+    if not allowed:
+        with _rate_limited_lock:
+            _rate_limited += 1
+        raise AdmissionRejected("rate limit exceeded", retry_after)
+
+
+@contextmanager
+def admit(key: Optional[str]) -> Iterator[None]:
+    """Kiểm tra rate limit rồi giữ 1 slot xử lý đồng thời trong suốt khối with."""
+    check_rate_limit(key)
+    if concurrency_limiter is None:
+        yield
+        return
+    concurrency_limiter.acquire()
+    try:
+        yield
+    finally:
+        concurrency_limiter.release()
+
+
+def admission_stats() -> dict:
+    """Số liệu admission control, dùng cho /metrics."""
+    with _rate_limited_lock:
+        stats = {"rate_limited": _rate_limited}
+    if concurrency_limiter is not None:
+        stats.update(concurrency_limiter.stats())
+    return stats
@@ -1,7 +1,37 @@
-from flask import Flask, render_template, request, jsonify
+import hmac
+import json
+import math
+from contextlib import ExitStack
+
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
 from flask_cors import CORS
 
-from chat import get_response
+from admission import AdmissionRejected, admission_stats, admit
+from chat import (
+    classify,
+    fast_path_stats,
+    get_handler,
+    handler_timings,
+    iter_response_for_tag,
+    prefetch_resources,
+)
+from config import (
+    CHATBOT_ADMIN_TOKEN,
+    CHATBOT_PROFILING_ENABLED,
+    CHATBOT_REQUEST_BUDGET,
+    CHATBOT_SESSION_CONTEXT_MAX_AGE,
+)
+from profiling import ProfilerBusy, request_profiler, sample_stacks
+from progress_cache import invalidate_group, progress_cache
+from resilience import breaker_states, clear_latency_budget, start_latency_budget
+from session_store import (
+    get_cached_context,
+    hash_token,
+    load_session,
+    remember_context,
+    save_session,
+    session_store,
+)
 from utils import get_user_context
 
 app = Flask(__name__)
@@ -20,21 +50,37 @@ def predict():
     Frontend gửi:
     {
       "message": "...",
-      "token": "<JWT accessToken>"
+      "token": "<JWT accessToken>",
+      "session_id": "<id hội thoại, tùy chọn>"
     }
     """
     data = request.get_json(silent=True) or {}
     text = data.get("message", "")
     token = data.get("token")
+    session_id = data.get("session_id") or request.headers.get("X-Session-Id")
 
     if not text or not text.strip():
         return jsonify({"error": "Message cannot be empty"}), 400
 
-    # Lấy context từ backend (nếu có token)
-    context = get_user_context(token)
+    # Quá rate limit hoặc quá tải -> AdmissionRejected -> 429 (xem _admission_rejected)
+    with admit(_client_key(token)):
+        session = load_session(session_id)
+
+        # Tất cả lời gọi backend trong request này dùng chung 1 latency budget
+        start_latency_budget(CHATBOT_REQUEST_BUDGET)
+        try:
+            # Phân loại trước, chỉ lấy các dữ liệu backend mà handler của tag cần
+            tag = classify(text)
+            resources = prefetch_resources(get_handler(tag), token, lambda fresh: _load_context(session, token, fresh))
+            context = resources["context"]
+
+            # Lấy câu trả lời từ model và apply context
+            parts = iter_response_for_tag(tag, context=context, token=token, session=session, resources=resources)
+            response_text = "\n\n".join(parts)
+        finally:
+            clear_latency_budget()
 
-    # Lấy câu trả lời từ model và apply context
-    response_text = get_response(text, context=context, token=token)
+    save_session(session_id, session)
 
     message = {
         "answer": response_text,
@@ -43,5 +89,217 @@ def predict():
     return jsonify(message)
 
 
+@app.post("/predict/stream")
+def predict_stream():
+    """
+    Giống /predict nhưng trả về từng phần câu trả lời ngay khi sẵn sàng
+    dưới dạng Server-Sent Events:
+
+    data: {"answer": "<phần 1>"}
+
+    data: {"answer": "<phần 2>"}
+
+    event: done
+    data: {}
+    """
+    data = request.get_json(silent=True) or {}
+    text = data.get("message", "")
+    token = data.get("token")
+    session_id = data.get("session_id") or request.headers.get("X-Session-Id")
+
+    if not text or not text.strip():
+        return jsonify({"error": "Message cannot be empty"}), 400
+
+    # Giữ slot admission cho tới khi stream kết thúc (hoặc response bị đóng trước khi stream chạy)
+    admission = ExitStack()
+    admission.enter_context(admit(_client_key(token)))
+    try:
+        response = _stream_response(admission, text, token, session_id)
+    except BaseException:
+        admission.close()
+        raise
+    response.call_on_close(admission.close)
+    return response
+
+
+def _stream_response(admission, text, token, session_id):
+    session = load_session(session_id)
+
+    def generate():
+        start_latency_budget(CHATBOT_REQUEST_BUDGET)
+        try:
+            tag = classify(text)
+            resources = prefetch_resources(get_handler(tag), token, lambda fresh: _load_context(session, token, fresh))
+            parts = iter_response_for_tag(
+                tag, context=resources["context"], token=token, session=session, resources=resources
+            )
+            for part in parts:
+                yield _sse_event({"answer": part})
+        finally:
+            clear_latency_budget()
+            save_session(session_id, session)
+            admission.close()
+        yield _sse_event({}, event="done")
+
+    headers = {
+        "Cache-Control": "no-cache",
+        # Tắt buffer của nginx để từng phần được gửi đi ngay
+        "X-Accel-Buffering": "no",
+    }
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers=headers)
+
+
+@app.errorhandler(AdmissionRejected)
+def _admission_rejected(exc):
+    response = jsonify({"error": "Too many requests", "reason": exc.reason})
+    response.status_code = 429
+    response.headers["Retry-After"] = exc.retry_after_header
+    return response
+
+
+def _client_key(token):
+    """
+    Key cho rate limit theo user: hash của token.
+    Request không có token trả về None (chỉ áp giới hạn đồng thời): sau router của
+    Heroku/Render mọi client có chung remote_addr, và request này không gọi backend.
+    """
+    return hash_token(token) if token else None
+
+
+def _load_context(session, token, fresh=False):
+    """
+    Lấy context từ session nếu còn mới, nếu không thì gọi backend (nếu có token).
+    fresh=True: luôn hỏi lại backend (request có điều kiện, 304 nếu không đổi).
+    """
+    context = None if fresh else get_cached_context(session, token, CHATBOT_SESSION_CONTEXT_MAX_AGE)
+    if context is None:
+        context = get_user_context(token)
+        remember_context(session, token, context)
+    return context
+
+
+def _sse_event(payload, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+@app.get("/metrics")
+def metrics():
+    """Số liệu vận hành của worker hiện tại (circuit breaker, session store, handler, fast path)."""
+    return jsonify({
+        "circuit_breakers": breaker_states(),
+        "sessions": session_store.stats(),
+        "handlers": handler_timings(),
+        "fast_path": fast_path_stats(),
+        "progress_cache": progress_cache.stats(),
+        "admission": admission_stats(),
+    })
+
+
+@app.post("/admin/progress-cache/invalidate")
+def invalidate_progress_cache():
+    """
+    Hook xóa cache tiến độ của một group (gọi khi task trong group thay đổi).
+    Body: {"groupId": "..."}; cần header X-Admin-Token = CHATBOT_ADMIN_TOKEN.
+    """
+    if not _is_admin_request():
+        return jsonify({"error": "Not found"}), 404
+
+    data = request.get_json(silent=True) or {}
+    group_id = data.get("groupId")
+    if not group_id:
+        return jsonify({"error": "groupId is required"}), 400
+
+    return jsonify({"invalidated": invalidate_group(group_id)})
+
+
+def _is_admin_request():
+    """Endpoint admin chỉ bật khi có CHATBOT_ADMIN_TOKEN và header khớp."""
+    if not CHATBOT_ADMIN_TOKEN:
+        return False
+    return hmac.compare_digest(request.headers.get("X-Admin-Token", ""), CHATBOT_ADMIN_TOKEN)
+
+
+def _start_request_profile():
+    """Bật cProfile cho request có header X-Profile (chỉ admin)."""
+    if request.headers.get("X-Profile") and _is_admin_request():
+        g.request_profile = request_profiler.start()
+
+
+def _finish_request_profile(response):
+    """Trả id kết quả qua header X-Profile-Id, dừng profile khi response đã gửi xong (kể cả SSE)."""
+    profile = g.pop("request_profile", None)
+    if profile is None:
+        return response
+    profile_id, profiler = profile
+    sort = request.headers.get("X-Profile-Sort", "cumulative")
+    path = request.path
+    response.headers["X-Profile-Id"] = profile_id
+    response.call_on_close(lambda: request_profiler.finish(profile_id, profiler, path, sort))
+    return response
+
+
+def _finite_float_arg(name, default):
+    """Query param kiểu số thực hữu hạn; None nếu không hợp lệ (không phải số, nan, inf)."""
+    raw = request.args.get(name)
+    if raw is None:
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        return None
+    return value if math.isfinite(value) else None
+
+
+def sample_profile():
+    """
+    Chạy sampling profiler trên worker này trong N giây, trả về collapsed stacks.
+    Query: ?seconds=10&interval=0.005&format=collapsed|json
+    """
+    if not _is_admin_request():
+        return jsonify({"error": "Not found"}), 404
+
+    seconds = _finite_float_arg("seconds", 10.0)
+    interval = _finite_float_arg("interval", 0.005)
+    if seconds is None or interval is None:
+        return jsonify({"error": "seconds and interval must be finite numbers"}), 400
+    try:
+        result = sample_stacks(seconds, interval)
+    except ProfilerBusy:
+        return jsonify({"error": "Another profile is running"}), 409
+
+    if request.args.get("format") == "json":
+        return jsonify(result)
+    return Response(result["collapsed"] + "\n", mimetype="text/plain")
+
+
+def list_request_profiles():
+    if not _is_admin_request():
+        return jsonify({"error": "Not found"}), 404
+    return jsonify({"profiles": request_profiler.list()})
+
+
+def get_request_profile(profile_id):
+    if not _is_admin_request():
+        return jsonify({"error": "Not found"}), 404
+    result = request_profiler.get(profile_id)
+    if result is None:
+        return jsonify({"error": "Not found"}), 404
+    return Response(result["stats"], mimetype="text/plain")
+
+
+def _register_profiling(flask_app):
+    flask_app.before_request(_start_request_profile)
+    flask_app.after_request(_finish_request_profile)
+    flask_app.add_url_rule("/admin/profile/sample", view_func=sample_profile, methods=["GET"])
+    flask_app.add_url_rule("/admin/profile/requests", view_func=list_request_profiles, methods=["GET"])
+    flask_app.add_url_rule("/admin/profile/requests/<profile_id>", view_func=get_request_profile, methods=["GET"])
+
+
+# Profiler chỉ được đăng ký khi bật, mặc định không có hook nào chạy trên mỗi request
+if CHATBOT_PROFILING_ENABLED:
+    _register_profiling(app)
+
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
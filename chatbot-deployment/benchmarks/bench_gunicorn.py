@@ -0,0 +1,161 @@
+import argparse
+import itertools
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from load_predict import MESSAGE, _CapacityLimitedBackend, _percentile  # noqa: E402
+
+"""
+Đo cấu hình gunicorn (gunicorn.conf.py) trên máy hiện tại: chạy lưới
+WEB_CONCURRENCY x GUNICORN_THREADS x CHATBOT_TORCH_THREADS, mỗi tổ hợp khởi động
+gunicorn thật rồi tải /predict bằng --clients client closed-loop trong --duration giây.
+
+Backend là backend giả lập của load_predict.py (--backend-latency mỗi lời gọi, đủ sức chứa để
+không thành nút cổ chai), rate limit theo user được tắt, admission control giữ cấu hình mặc định.
+Báo cáo req/s, p50/p99 của request 200, số 429 và số lỗi cho từng tổ hợp.
+
+Ví dụ:
+    python benchmarks/bench_gunicorn.py --workers 1 2 4 --threads 8 28 --torch-threads 1 2 --clients 64
+"""
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_gunicorn(workers, threads, torch_threads, port, backend_url, startup_timeout):
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_THREADS=str(threads),
+        CHATBOT_TORCH_THREADS=str(torch_threads),
+        BACKEND_API_URL=backend_url,
+        CHATBOT_RATE_LIMIT_PER_SECOND="0",
+        GUNICORN_LOG_LEVEL="warning",
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", "/dev/null", "app:app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {process.returncode}")
+        try:
+            if requests.get(f"{url}/metrics", timeout=1).status_code == 200:
+                return process, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    _stop(process)
+    raise RuntimeError(f"gunicorn not ready after {startup_timeout}s")
+
+
+def _stop(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def run_load(url, clients, duration):
+    ok = []
+    rejected = 0
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client_loop(index):
+        nonlocal rejected, errors
+        session = requests.Session()
+        payload = {"message": MESSAGE, "token": f"bench-user-{index}"}
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                status = session.post(f"{url}/predict", json=payload, timeout=30).status_code
+            except requests.RequestException:
+                status = None
+            elapsed = time.perf_counter() - started
+            with lock:
+                if status == 200:
+                    ok.append(elapsed)
+                elif status == 429:
+                    rejected += 1
+                else:
+                    errors += 1
+
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(clients)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    return {
+        "ok_per_second": len(ok) / elapsed,
+        "ok_p50_ms": _percentile(ok, 0.50) * 1e3,
+        "ok_p99_ms": _percentile(ok, 0.99) * 1e3,
+        "rejected": rejected,
+        "errors": errors,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark gunicorn worker/thread settings for /predict")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2], help="WEB_CONCURRENCY values")
+    parser.add_argument("--threads", type=int, nargs="+", default=[8, 28], help="GUNICORN_THREADS values")
+    parser.add_argument("--torch-threads", type=int, nargs="+", default=[1, 2], help="CHATBOT_TORCH_THREADS values")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=1.0, help="load before measuring each setting")
+    parser.add_argument("--backend-latency", type=float, default=0.02)
+    parser.add_argument("--backend-capacity", type=int, default=256)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    args = parser.parse_args(argv)
+
+    backend = _CapacityLimitedBackend(args.backend_capacity, args.backend_latency)
+    print(
+        f"cpus: {os.cpu_count()}; clients: {args.clients}, {args.duration}s each;"
+        f" backend: {args.backend_latency * 1e3:.0f} ms per call"
+    )
+    print(f"{'workers':>7} {'threads':>7} {'torch':>5} {'req/s':>7} {'p50':>9} {'p99':>9} {'429s':>6} {'errors':>6}")
+    try:
+        for workers, threads, torch_threads in itertools.product(args.workers, args.threads, args.torch_threads):
+            process, url = _start_gunicorn(
+                workers, threads, torch_threads, _free_port(), backend.url, args.startup_timeout
+            )
+            try:
+                if args.warmup > 0:
+                    run_load(url, args.clients, args.warmup)
+                result = run_load(url, args.clients, args.duration)
+            finally:
+                _stop(process)
+            print(
+                f"{workers:>7} {threads:>7} {torch_threads:>5} {result['ok_per_second']:>7.1f}"
+                f" {result['ok_p50_ms']:>7.1f}ms {result['ok_p99_ms']:>7.1f}ms"
+                f" {result['rejected']:>6} {result['errors']:>6}"
+            )
+    finally:
+        backend.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils  # noqa: E402
+from task_records import compact_context  # noqa: E402
+
+"""
+Benchmark format_task_list / replace_placeholders với danh sách task lớn.
+
+So sánh render toàn bộ danh sách (limit=0) với chọn top-K (mặc định K=20) theo dueDate
+và theo priority, trên context đã compact (TaskRecord) giống context thật từ backend.
+Cột "+ json" tính thêm thời gian encode câu trả lời như response của /predict.
+
+Ví dụ:
+    python benchmarks/bench_task_list.py --tasks 10000 --limit 20
+"""
+
+PRIORITIES = ["low", "medium", "high", "urgent", "critical", None]
+TEMPLATE = "Bạn có những việc cần làm sau đây nhé: {activeTasks}"
+
+
+def build_context(count, seed=0):
+    rng = random.Random(seed)
+    details = [
+        {
+            "id": f"t{i}",
+            "title": f"Task number {i}",
+            "status": "todo",
+            "priority": rng.choice(PRIORITIES),
+            "dueDate": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00.000Z" if rng.random() < 0.9 else None,
+        }
+        for i in range(count)
+    ]
+    details = [{key: value for key, value in detail.items() if value is not None} for detail in details]
+    titles = [detail["title"] for detail in details]
+    return compact_context({
+        "user": {"name": "Nguyen An"},
+        "tasks": {
+            "activeTasks": titles,
+            "activeTasksCount": count,
+            "activeTaskDetails": details,
+        },
+    })
+
+
+def _time(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark task list rendering")
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    context = build_context(args.tasks)
+    print(f"{args.tasks} tasks, best of {args.repeat} runs")
+    for order in ("dueDate", "priority"):
+        utils.CHATBOT_TASK_LIST_ORDER = order
+        for limit in (0, args.limit):
+            output = utils.format_task_list(context, "all", limit=limit)
+            seconds = _time(lambda limit=limit: utils.format_task_list(context, "all", limit=limit), args.repeat)
+            with_json = _time(
+                lambda limit=limit: json.dumps({"answer": utils.format_task_list(context, "all", limit=limit)}),
+                args.repeat,
+            )
+            label = "all" if limit <= 0 else f"top {limit}"
+            print(
+                f"  order={order:<8} {label:>7}: format_task_list {seconds * 1e3:7.3f} ms,"
+                f" + json {with_json * 1e3:7.3f} ms, {len(output):7d} chars"
+            )
+
+    utils.CHATBOT_TASK_LIST_LIMIT = args.limit
+    seconds = _time(lambda: utils.replace_placeholders(TEMPLATE, context), args.repeat)
+    print(f"  replace_placeholders (top {args.limit}): {seconds * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
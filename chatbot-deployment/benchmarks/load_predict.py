@@ -0,0 +1,159 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import admission  # noqa: E402
+import app as app_module  # noqa: E402
+import utils  # noqa: E402
+from admission import ConcurrencyLimiter  # noqa: E402
+
+"""
+Load test cho /predict khi quá tải, so sánh có và không có admission control.
+
+Backend giả lập có sức chứa giới hạn (--backend-capacity lời gọi đồng thời, mỗi lời gọi
+--backend-latency giây), giống backend/DB thật: vượt sức chứa thì request phải xếp hàng.
+Mỗi client là 1 thread gửi /predict liên tục (closed loop) bằng token riêng
+(rate limit theo user được tắt để chỉ đo giới hạn đồng thời), nhận 429 thì chờ Retry-After
+rút gọn (--backoff) rồi gửi tiếp.
+
+Không có admission control, latency tăng theo số client vì mọi request đều xếp hàng ở backend.
+Có admission control, request được nhận giữ p99 ổn định và phần vượt quá bị từ chối nhanh bằng 429.
+
+Ví dụ:
+    python benchmarks/load_predict.py --clients 8 32 64 --duration 5
+"""
+
+MESSAGE = "Hôm nay có những task gì?"
+
+
+class _CapacityLimitedBackend:
+    def __init__(self, capacity, latency):
+        slots = threading.BoundedSemaphore(capacity)
+        body = json.dumps({"success": True, "data": {
+            "user": {"name": "Nguyen An"},
+            "tasks": {"todayTasks": ["Viết báo cáo"], "todayTasksCount": 1, "futureTasksCount": 0},
+        }}).encode("utf-8")
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                with slots:
+                    time.sleep(latency)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = _handle
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _percentile(values, fraction):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def run_scenario(clients, duration, backoff):
+    ok = []
+    rejected = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client_loop(index):
+        client = app_module.app.test_client()
+        payload = {"message": MESSAGE, "token": f"load-user-{index}"}
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            response = client.post("/predict", json=payload)
+            elapsed = time.perf_counter() - started
+            with lock:
+                if response.status_code == 200:
+                    ok.append(elapsed)
+                elif response.status_code == 429:
+                    rejected.append(elapsed)
+                else:
+                    errors.append(response.status_code)
+            if response.status_code == 429:
+                time.sleep(backoff)
+
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(clients)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    return {
+        "ok_per_second": len(ok) / elapsed,
+        "ok_p50_ms": _percentile(ok, 0.50) * 1e3,
+        "ok_p99_ms": _percentile(ok, 0.99) * 1e3,
+        "rejected": len(rejected),
+        "rejected_p99_ms": _percentile(rejected, 0.99) * 1e3,
+        "errors": len(errors),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Overload test for /predict admission control")
+    parser.add_argument("--clients", type=int, nargs="+", default=[8, 32, 64])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--backend-capacity", type=int, default=4)
+    parser.add_argument("--backend-latency", type=float, default=0.02)
+    parser.add_argument("--max-concurrent", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=8)
+    parser.add_argument("--queue-timeout", type=float, default=0.1)
+    parser.add_argument("--backoff", type=float, default=0.05, help="sleep after a 429 before retrying")
+    args = parser.parse_args(argv)
+
+    backend = _CapacityLimitedBackend(args.backend_capacity, args.backend_latency)
+    utils.BACKEND_API_URL = backend.url
+    admission.rate_limiter = None
+
+    print(
+        f"backend: {args.backend_capacity} concurrent x {args.backend_latency * 1e3:.0f} ms;"
+        f" admission: {args.max_concurrent} concurrent, queue {args.queue_size}, {args.queue_timeout}s"
+    )
+    print(f"{'admission':>9} {'clients':>7} {'ok/s':>7} {'ok p50':>9} {'ok p99':>9} {'429s':>6} {'429 p99':>9} {'errors':>6}")
+    try:
+        for clients in args.clients:
+            for enabled in (False, True):
+                admission.concurrency_limiter = (
+                    ConcurrencyLimiter(args.max_concurrent, args.queue_size, args.queue_timeout) if enabled else None
+                )
+                result = run_scenario(clients, args.duration, args.backoff)
+                print(
+                    f"{'on' if enabled else 'off':>9} {clients:>7} {result['ok_per_second']:>7.1f}"
+                    f" {result['ok_p50_ms']:>7.1f}ms {result['ok_p99_ms']:>7.1f}ms {result['rejected']:>6}"
+                    f" {result['rejected_p99_ms']:>7.1f}ms {result['errors']:>6}"
+                )
+    finally:
+        backend.close()
+
+
+if __name__ == "__main__":
+    main()
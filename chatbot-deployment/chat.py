@@ -1,10 +1,15 @@
 import random
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 
 import torch
 
+from context_view import overlay_context, overlay_nested
 from model import NeuralNet
-from nltk_utils import bag_of_words, tokenize
+from nltk_utils import bag_of_words, stem, tokenize
 from utils import (
     replace_placeholders,
     has_special_day_today,
@@ -12,9 +17,9 @@ from utils import (
     evaluate_recommended_tasks,
     evaluate_task_completion_status,
     evaluate_future_tasks_status,
-    get_group_progress,
-    get_member_progress,
+    get_future_task_ids,
 )
+from progress_cache import get_cached_group_progress, get_cached_member_progress
 
 device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
@@ -37,12 +42,13 @@ model.eval()
 
 bot_name = "Sam"
 
+_intents_by_tag = {}
+for _intent in intents["intents"]:
+    _intents_by_tag.setdefault(_intent.get("tag"), _intent)
+
 
 def _get_intent_by_tag(tag: str):
-    for intent in intents["intents"]:
-        if intent.get("tag") == tag:
-            return intent
-    return None
+    return _intents_by_tag.get(tag)
 
 
 def _build_response_for_tag(tag: str, context=None) -> str:
@@ -55,7 +61,7 @@ def _build_response_for_tag(tag: str, context=None) -> str:
 
 def _create_today_only_context(context):
     """
-    Tạo context mới chỉ chứa task hôm nay để dùng cho intent todayTask.
+    Tạo view của context chỉ chứa task hôm nay để dùng cho intent todayTask.
     """
     if not context:
         return context
@@ -64,8 +70,7 @@ def _create_today_only_context(context):
     today_tasks = tasks_info.get("todayTasks") or []
     today_task_details = tasks_info.get("todayTaskDetails") or []
     
-    new_context = context.copy()
-    new_context["tasks"] = {
+    return overlay_context(context, tasks={
         "activeTasks": today_tasks,
         "activeTasksCount": len(today_tasks),
         "todayTasks": today_tasks,
@@ -75,13 +80,12 @@ def _create_today_only_context(context):
         "activeTaskDetails": today_task_details,
         "todayTaskDetails": today_task_details,
         "futureTaskDetails": []
-    }
-    return new_context
+    })
 
 
 def _create_future_only_context(context):
     """
-    Tạo context mới chỉ chứa task tương lai để dùng cho intent recommentedTasks.
+    Tạo view của context chỉ chứa task tương lai để dùng cho intent recommentedTasks.
     """
     if not context:
         return context
@@ -90,8 +94,7 @@ def _create_future_only_context(context):
     future_tasks = tasks_info.get("futureTasks") or []
     future_task_details = tasks_info.get("futureTaskDetails") or []
     
-    new_context = context.copy()
-    new_context["tasks"] = {
+    return overlay_context(context, tasks={
         "activeTasks": future_tasks,
         "activeTasksCount": len(future_tasks),
         "todayTasks": [],
@@ -101,16 +104,427 @@ def _create_future_only_context(context):
         "activeTaskDetails": future_task_details,
         "todayTaskDetails": [],
         "futureTaskDetails": future_task_details
+    })
+
+
+def _remember_recommended_tasks(token, context, session=None):
+    """
+    Lưu task tương lai làm "task được đề xuất".
+    Nếu session đã lưu đúng danh sách này ở lượt trước thì bỏ qua, không gọi lại backend.
+    """
+    task_ids = get_future_task_ids(context)
+    if session is not None and task_ids and session.get("recommended_task_ids") == task_ids:
+        return
+    if save_recommended_tasks(token, context) and session is not None:
+        session["recommended_task_ids"] = task_ids
+
+
+# ---------------------------------------------------------------------------
+# Registry handler theo tag
+#
+# Mỗi tag được map tới 1 IntentHandler. Handler khai báo các resource backend
+# nó cần (xem RESOURCE_FETCHERS) để app có thể lấy trước song song, hoặc bỏ qua
+# hoàn toàn (vd "goodbye" không cần gọi backend). Tag không có handler riêng
+# dùng handler mặc định: render template của chính tag đó.
+# ---------------------------------------------------------------------------
+
+LOW_CONFIDENCE_RESPONSE = "I do not understand..."
+CONFIDENCE_THRESHOLD = 0.75
+
+
+class IntentHandler:
+    """Handler cho một tag: hàm render (generator) và các resource backend cần dùng."""
+
+    __slots__ = ("name", "func", "resources")
+
+    def __init__(self, name, func, resources=()):
+        self.name = name
+        self.func = func
+        self.resources = tuple(resources)
+
+    def __repr__(self):
+        return f"IntentHandler({self.name!r}, resources={self.resources!r})"
+
+
+HANDLERS = {}
+
+
+def register_handler(*handler_tags, resources=()):
+    """Decorator đăng ký hàm render cho một hoặc nhiều tag."""
+    def decorator(func):
+        handler = IntentHandler(func.__name__, func, resources)
+        for handler_tag in handler_tags:
+            HANDLERS[handler_tag] = handler
+        return func
+    return decorator
+
+
+# Resource backend mà handler có thể khai báo (ngoài 2 loại context bên dưới).
+# name -> (hàm lấy dữ liệu (token, context), có phụ thuộc context hay không)
+#
+# Resource không phụ thuộc context được lấy trước, song song với context. Resource phụ thuộc
+# context không được lấy trước: handler gọi _get_resource khi thật sự cần, sau khi đã kiểm tra
+# context đủ thông tin (vd teamProgress không có group thì hỏi tên group, không gọi backend).
+#
+# - "context": context của user, được phép dùng lại snapshot còn mới trong session
+# - "fresh_context": context lấy lại từ backend (không dùng snapshot trong session), cho các
+#   handler đánh giá task đã hoàn thành hay chưa: user vừa hoàn thành task trên UI rồi báo
+#   cho chatbot thì snapshot vài giây trước đã cũ. Vẫn rẻ nhờ request có điều kiện (304).
+CONTEXT_RESOURCES = ("context", "fresh_context")
+
+RESOURCE_FETCHERS = {
+    "recommended_eval": (lambda token, context: evaluate_recommended_tasks(token), False),
+    # Tiến độ được cache theo group ID trong context nên phải chờ có context
+    "group_progress": (get_cached_group_progress, True),
+    "member_progress": (
+        lambda token, context: get_cached_member_progress(
+            token, context, ((context or {}).get("member") or {}).get("id") or ""
+        ),
+        True,
+    ),
+}
+
+_prefetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="chatbot-prefetch")
+
+
+def _get_resource(resources, name, token, context):
+    """Lấy resource đã prefetch, nếu chưa có thì gọi backend ngay."""
+    if resources is not None and name in resources:
+        return resources[name]
+    fetch, _ = RESOURCE_FETCHERS[name]
+    return fetch(token, context)
+
+
+def prefetch_resources(handler, token, context_loader):
+    """
+    Lấy trước song song các resource mà handler khai báo.
+
+    - context_loader: hàm context_loader(fresh) trả về context, chỉ gọi nếu handler cần
+      "context" hoặc "fresh_context" (fresh=True: không dùng snapshot trong session)
+    - Resource không phụ thuộc context được lấy song song với context; resource phụ thuộc
+      context để handler tự lấy khi cần (_get_resource).
+    Trả về dict name -> dữ liệu (luôn có key "context").
+    """
+    wanted = handler.resources
+    independent = [name for name in wanted if name in RESOURCE_FETCHERS and not RESOURCE_FETCHERS[name][1]]
+
+    # Chạy trong bản sao contextvars để dùng chung latency budget của request
+    futures = {
+        name: _prefetch_executor.submit(copy_context().run, RESOURCE_FETCHERS[name][0], token, None)
+        for name in independent
     }
-    return new_context
+
+    context = None
+    if any(name in wanted for name in CONTEXT_RESOURCES):
+        context = context_loader("fresh_context" in wanted)
+    resources = {"context": context}
+    for name, future in futures.items():
+        resources[name] = future.result()
+    return resources
+
+
+def _future_tasks_count(context) -> int:
+    tasks_info = (context or {}).get("tasks") or {}
+    return tasks_info.get("futureTasksCount") or 0
+
+
+def _iter_recommended_tasks(token, context, session):
+    """Lưu và gợi ý thêm các task tương lai (dùng sau todayTask/finishAllTask)."""
+    if _future_tasks_count(context) > 0:
+        # Lưu danh sách task tương lai là "task được đề xuất"
+        _remember_recommended_tasks(token, context, session)
+        # Tạo context riêng cho recommentedTasks chỉ chứa task tương lai
+        future_context = _create_future_only_context(context)
+        extra = _build_response_for_tag("recommentedTasks", future_context)
+        if extra:
+            yield extra
+
+
+@register_handler("greeting", resources=("context",))
+def _handle_greeting(tag, context, token, session, resources):
+    """Sau câu chào user, kiểm tra ngày đặc biệt; nếu đúng, trả greeting kèm specialDay."""
+    # Trả câu chào trước, sau đó chúc mừng ngày đặc biệt (nếu có)
+    greeting_resp = _build_response_for_tag("greeting", context)
+    if greeting_resp:
+        yield greeting_resp
+
+    if has_special_day_today():
+        special_resp = _build_response_for_tag("specialDay", context)
+        if special_resp:
+            yield special_resp
 
 
-def get_response(msg, context=None, token=None):
+@register_handler("finishAllTask", resources=("fresh_context",))
+def _handle_finish_all_task(tag, context, token, session, resources):
     """
-    Lấy câu trả lời từ mô hình và apply context (thay placeholders nếu có),
-    đồng thời áp dụng các rule đặc biệt theo yêu cầu.
+    Logic khi user nói đã hoàn thành tất cả task (finishAllTask).
+    Kiểm tra trạng thái thực tế từ database:
+    - Nếu đúng (không còn task active) -> finishAllRecommentedTask
+    - Nếu sai, kiểm tra finishTodayTask (không còn task hôm nay) -> finishTodayTask
+    - Nếu không -> todayTask
+    Đồng thời, nếu đã hoàn thành task hôm nay nhưng vẫn còn task khác -> thêm recommentedTasks.
     """
-    sentence = tokenize(msg)
+    task_status = evaluate_task_completion_status(context)
+
+    if task_status["all_tasks_completed"]:
+        # Đúng: không còn task active nào -> trả finishAllRecommentedTask
+        resp = _build_response_for_tag("finishAllRecommentedTask", context)
+    elif task_status["today_tasks_completed"]:
+        # Sai nhưng không còn task hôm nay -> trả finishTodayTask
+        resp = _build_response_for_tag("finishTodayTask", context)
+    else:
+        # Không: vẫn còn task hôm nay -> trả todayTask
+        resp = _build_response_for_tag("todayTask", context)
+
+    if resp:
+        yield resp
+
+    # Nếu đã hoàn thành task hôm nay và có task tương lai -> gợi ý thêm (chỉ task tương lai)
+    if task_status["today_tasks_completed"]:
+        yield from _iter_recommended_tasks(token, context, session)
+
+
+@register_handler("todayTask", resources=("fresh_context",))
+def _handle_today_task(tag, context, token, session, resources):
+    """
+    Khi user hỏi về task hôm nay (todayTask):
+    - Chỉ trả lời các task có due date là hôm nay
+    - Nếu đã hoàn thành task hôm nay và có task tương lai -> thêm recommentedTasks (chỉ task tương lai)
+    """
+    task_status = evaluate_task_completion_status(context)
+    # Tạo context riêng cho todayTask chỉ chứa task hôm nay
+    today_context = _create_today_only_context(context)
+    resp = _build_response_for_tag("todayTask", today_context)
+    if resp:
+        yield resp
+
+    if task_status["today_tasks_completed"]:
+        yield from _iter_recommended_tasks(token, context, session)
+
+
+@register_handler(
+    "finishPartOfRecommentedTask",
+    "finishAllRecommentedTask",
+    "Warning",
+    resources=("fresh_context", "recommended_eval"),
+)
+def _handle_recommended_tasks_status(tag, context, token, session, resources):
+    """
+    Kiểm tra trạng thái hoàn thành các task được đề xuất dựa trên database.
+    1. Nếu finishAllRecommentedTask yes → trả response của intent finishAllRecommentedTask
+    2. Nếu không → kiểm tra finishPartOfRecommentedTask:
+       - Nếu user báo đã làm recommented task → kiểm tra trạng thái các task ở tương lai
+       - Nếu đúng (có một phần completed) → trả response của intent finishPartOfRecommentedTask
+       - Nếu không đúng (chưa có task nào completed) → trả Warning
+    """
+    eval_result = _get_resource(resources, "recommended_eval", token, context)
+    resp = ""
+
+    if eval_result and eval_result.get("hasRecommended"):
+        # Nếu tất cả task được đề xuất đã completed → trả finishAllRecommentedTask
+        if eval_result.get("allCompleted"):
+            resp = _build_response_for_tag("finishAllRecommentedTask", context)
+            if resp:
+                yield resp
+                return
+
+        # Chỉ xử lý khi tag là finishPartOfRecommentedTask (user báo đã làm recommented task)
+        if tag == "finishPartOfRecommentedTask":
+            # Ưu tiên: Kiểm tra từ recommended tasks (đã lưu trong DB, là các task tương lai)
+            if eval_result.get("anyCompleted"):
+                resp = _build_response_for_tag("finishPartOfRecommentedTask", context)
+            else:
+                resp = _build_response_for_tag("Warning", context)
+
+    if resp:
+        yield resp
+        return
+
+    # Fallback: nếu không có dữ liệu DB hoặc tag không phải finishPartOfRecommentedTask
+    if tag == "finishAllRecommentedTask":
+        resp = _build_response_for_tag("finishAllRecommentedTask", context)
+    elif tag == "finishPartOfRecommentedTask":
+        # Nếu không có dữ liệu DB, kiểm tra trạng thái task tương lai từ context
+        future_status = evaluate_future_tasks_status(context)
+        if future_status["has_future_tasks"]:
+            if future_status["completed_future_tasks_count"] > 0:
+                # Đúng: có một phần task tương lai đã completed → trả finishPartOfRecommentedTask
+                resp = _build_response_for_tag("finishPartOfRecommentedTask", context)
+            else:
+                # Không đúng: chưa có task tương lai nào completed → trả Warning
+                resp = _build_response_for_tag("Warning", context)
+        else:
+            # Không có task tương lai, dùng intent mặc định
+            resp = _build_response_for_tag("finishPartOfRecommentedTask", context)
+    else:
+        resp = _build_response_for_tag("Warning", context)
+
+    if resp:
+        yield resp
+
+
+@register_handler("teamProgress", resources=("context", "group_progress"))
+def _handle_team_progress(tag, context, token, session, resources):
+    """Tiến độ toàn team trong group (chỉ cho Product Owner/PM)."""
+    # Nếu thiếu thông tin group trong context, yêu cầu user chỉ định group
+    group_info = (context or {}).get("group") or {}
+    if not group_info.get("id") and not group_info.get("name"):
+        ask_resp = _build_response_for_tag("AskGroupName", context)
+        if ask_resp:
+            yield ask_resp
+            return
+
+    progress = _get_resource(resources, "group_progress", token, context)
+    if not progress:
+        yield "Chatbot chỉ hỗ trợ xem tiến độ team cho Product Owner/PM của group này, hoặc hiện chưa có dữ liệu task phù hợp."
+        return
+
+    total = progress.get("totalTasks", 0)
+    todo = progress.get("todo", {})
+    in_progress = progress.get("in_progress", {})
+    completed = progress.get("completed", {})
+    incomplete = progress.get("incomplete", {})
+
+    # Map sang placeholders cho intents
+    team_context = {
+        "team_total_tasks": total,
+        "team_todo_count": todo.get("count", 0),
+        "team_todo_percent": todo.get("percent", 0),
+        "team_inprogress_count": in_progress.get("count", 0),
+        "team_inprogress_percent": in_progress.get("percent", 0),
+        "team_completed_count": completed.get("count", 0),
+        "team_completed_percent": completed.get("percent", 0),
+        "team_incomplete_count": incomplete.get("count", 0),
+        "team_incomplete_percent": incomplete.get("percent", 0),
+    }
+
+    # Ghép vào view của context cho replace_placeholders (không sửa context gốc)
+    merged_context = overlay_nested(context, "stats", **team_context)
+
+    resp = _build_response_for_tag("teamProgress", merged_context)
+    if resp:
+        yield resp + f"\n(Tổng số task trong group: {total})"
+
+
+@register_handler("memberProgress", resources=("context", "member_progress"))
+def _handle_member_progress(tag, context, token, session, resources):
+    """Tiến độ theo từng thành viên trong group (chỉ cho Product Owner/PM)."""
+    # Ở phiên bản đơn giản, tạm thời yêu cầu frontend/backend truyền sẵn memberId trong context
+    member_info = (context or {}).get("member") or {}
+    member_name = member_info.get("name") or "thành viên này"
+
+    progress = _get_resource(resources, "member_progress", token, context)
+    if not progress:
+        yield "Chatbot chỉ hỗ trợ xem tiến độ theo thành viên cho Product Owner/PM của group này, hoặc hiện chưa có dữ liệu task phù hợp."
+        return
+
+    total = progress.get("totalTasks", 0)
+    todo = progress.get("todo", {})
+    in_progress = progress.get("in_progress", {})
+    completed = progress.get("completed", {})
+    incomplete = progress.get("incomplete", {})
+
+    member_context = {
+        "member_name": member_name,
+        "member_total_tasks": total,
+        "member_todo_count": todo.get("count", 0),
+        "member_todo_percent": todo.get("percent", 0),
+        "member_inprogress_count": in_progress.get("count", 0),
+        "member_inprogress_percent": in_progress.get("percent", 0),
+        "member_completed_count": completed.get("count", 0),
+        "member_completed_percent": completed.get("percent", 0),
+        "member_incomplete_count": incomplete.get("count", 0),
+        "member_incomplete_percent": incomplete.get("percent", 0),
+    }
+
+    merged_context = overlay_nested(context, "memberStats", **member_context)
+
+    resp = _build_response_for_tag("memberProgress", merged_context)
+    if resp:
+        yield resp + f"\n(Tổng số task của {member_name} trong group: {total})"
+
+
+def _handle_default(tag, context, token, session, resources):
+    """Mặc định: dùng intent được model dự đoán với context."""
+    resp = _build_response_for_tag(tag, context)
+    if resp:
+        yield resp
+
+
+def _handle_low_confidence(tag, context, token, session, resources):
+    yield LOW_CONFIDENCE_RESPONSE
+
+
+LOW_CONFIDENCE_HANDLER = IntentHandler("_handle_low_confidence", _handle_low_confidence)
+
+
+def _template_needs_context(tag) -> bool:
+    """True nếu một trong các template của tag có placeholder lấy từ context."""
+    intent = _intents_by_tag.get(tag) or {}
+    for template in intent.get("responses") or []:
+        if "{" in template.replace("{special_day}", ""):
+            return True
+    return False
+
+
+def _build_default_handlers():
+    for intent_tag in tags:
+        if intent_tag not in HANDLERS:
+            resources = ("context",) if _template_needs_context(intent_tag) else ()
+            HANDLERS[intent_tag] = IntentHandler("_handle_default", _handle_default, resources)
+
+
+_build_default_handlers()
+
+
+_handler_timings = {}
+_handler_timings_lock = threading.Lock()
+
+
+def _record_handler_timing(name: str, elapsed: float) -> None:
+    with _handler_timings_lock:
+        stats = _handler_timings.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        elapsed_ms = elapsed * 1000
+        stats["count"] += 1
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+
+def handler_timings():
+    """Thống kê thời gian render theo handler, dùng cho /metrics."""
+    with _handler_timings_lock:
+        return {name: dict(stats) for name, stats in _handler_timings.items()}
+
+
+# ---------------------------------------------------------------------------
+# Fast path cho câu trùng (hoặc gần trùng) với pattern trong intents.json
+#
+# - _fast_path_exact: text đã chuẩn hóa -> kết quả phân loại, bỏ qua cả tokenize/stem
+# - _fast_path_stems: tập stem (thuộc vocabulary) -> kết quả phân loại, bỏ qua forward của model
+#
+# Kết quả lưu trong index được tính bằng chính model lúc build, nên luôn khớp với model.
+# Input của model chỉ phụ thuộc vào tập stem thuộc all_words, vì vậy index theo stem
+# cho kết quả giống hệt model với mọi câu có cùng tập stem.
+# Cần gọi rebuild_fast_path() mỗi khi intents hoặc model thay đổi.
+# ---------------------------------------------------------------------------
+
+_MISS = object()
+_all_words_set = frozenset()
+_fast_path_exact = {}
+_fast_path_stems = {}
+_fast_path_stats = {"exact_hits": 0, "stem_hits": 0, "misses": 0}
+_fast_path_lock = threading.Lock()
+
+
+def _normalize_text(msg: str) -> str:
+    return " ".join(msg.lower().split())
+
+
+def _stem_key(sentence):
+    return frozenset(stem(word) for word in sentence) & _all_words_set
+
+
+def _classify_with_model(sentence):
     X = bag_of_words(sentence, all_words)
     X = X.reshape(1, X.shape[0])
     X = torch.from_numpy(X).to(device)
@@ -123,233 +537,139 @@ def get_response(msg, context=None, token=None):
     probs = torch.softmax(output, dim=1)
     prob = probs[0][predicted.item()]
 
-    # Nếu độ tin cậy thấp, trả lời mặc định
-    if prob.item() <= 0.75:
-        return "I do not understand..."
+    if prob.item() <= CONFIDENCE_THRESHOLD:
+        return None
+    return tag
 
-    # 1. Sau câu chào user, kiểm tra ngày đặc biệt; nếu đúng, trả greeting kèm specialDay.
-    if tag == "greeting":
-        greeting_resp = _build_response_for_tag("greeting", context)
-        special_resp = ""
 
-        if has_special_day_today():
-            special_resp = _build_response_for_tag("specialDay", context)
+def rebuild_fast_path():
+    """Build lại index fast path từ intents và model hiện tại."""
+    global _all_words_set, _fast_path_exact, _fast_path_stems
 
-        # Trả cả câu chào và chúc mừng ngày đặc biệt (nếu có)
-        if greeting_resp and special_resp:
-            return f"{greeting_resp}\n\n{special_resp}"
-        if greeting_resp:
-            return greeting_resp
-        if special_resp:
-            return special_resp
-
-    # 2. Logic khi user nói đã hoàn thành tất cả task (finishAllTask)
-    #    Kiểm tra trạng thái thực tế từ database:
-    #    - Nếu đúng (không còn task active) -> finishAllRecommentedTask
-    #    - Nếu sai, kiểm tra finishTodayTask (không còn task hôm nay) -> finishTodayTask
-    #    - Nếu không -> todayTask
-    #    Đồng thời, nếu đã hoàn thành task hôm nay nhưng vẫn còn task khác -> thêm recommentedTasks.
-    if tag == "finishAllTask":
-        # Đánh giá trạng thái task từ database
-        task_status = evaluate_task_completion_status(context)
-        
-        if task_status["all_tasks_completed"]:
-            # Đúng: không còn task active nào -> trả finishAllRecommentedTask
-            resp = _build_response_for_tag("finishAllRecommentedTask", context)
-        else:
-            # Sai: vẫn còn task, kiểm tra finishTodayTask
-            if task_status["today_tasks_completed"]:
-                # Đúng: không còn task hôm nay -> trả finishTodayTask
-                resp = _build_response_for_tag("finishTodayTask", context)
-            else:
-                # Không: vẫn còn task hôm nay -> trả todayTask
-                resp = _build_response_for_tag("todayTask", context)
-
-        # Nếu đã hoàn thành task hôm nay và có task tương lai -> gợi ý thêm (chỉ task tương lai)
-        if task_status["today_tasks_completed"]:
-            tasks_info = (context or {}).get("tasks") or {}
-            future_tasks_count = tasks_info.get("futureTasksCount") or 0
-            if future_tasks_count > 0:
-                # Lưu danh sách task tương lai là "task được đề xuất"
-                save_recommended_tasks(token, context)
-                # Tạo context riêng cho recommentedTasks chỉ chứa task tương lai
-                future_context = _create_future_only_context(context)
-                extra = _build_response_for_tag("recommentedTasks", future_context)
-                if extra:
-                    return (resp or "") + "\n\n" + extra
-
-        if resp:
-            return resp
-
-    # 3. Khi user hỏi về task hôm nay (todayTask)
-    #    - Chỉ trả lời các task có due date là hôm nay
-    #    - Nếu đã hoàn thành task hôm nay và có task tương lai -> thêm recommentedTasks (chỉ task tương lai)
-    if tag == "todayTask":
-        task_status = evaluate_task_completion_status(context)
-        # Tạo context riêng cho todayTask chỉ chứa task hôm nay
-        today_context = _create_today_only_context(context)
-        resp = _build_response_for_tag("todayTask", today_context)
-        
-        # Nếu đã hoàn thành task hôm nay và có task tương lai -> gửi thêm recommentedTasks
-        if task_status["today_tasks_completed"]:
-            tasks_info = (context or {}).get("tasks") or {}
-            future_tasks_count = tasks_info.get("futureTasksCount") or 0
-            if future_tasks_count > 0:
-                # Lưu danh sách task tương lai là "task được đề xuất"
-                save_recommended_tasks(token, context)
-                # Tạo context riêng cho recommentedTasks chỉ chứa task tương lai
-                future_context = _create_future_only_context(context)
-                extra = _build_response_for_tag("recommentedTasks", future_context)
-                if extra:
-                    return (resp or "") + "\n\n" + extra
-        
-        if resp:
-            return resp
-
-    # 4. Kiểm tra trạng thái hoàn thành các task được đề xuất dựa trên database
-    #    Logic:
-    #    1. Nếu finishAllRecommentedTask yes → trả response của intent finishAllRecommentedTask
-    #    2. Nếu không → kiểm tra finishPartOfRecommentedTask:
-    #       - Nếu user báo đã làm recommented task → kiểm tra trạng thái các task ở tương lai
-    #       - Nếu đúng (có một phần completed) → trả response của intent finishPartOfRecommentedTask
-    #       - Nếu không đúng (chưa có task nào completed) → trả Warning
-    if tag in ("finishPartOfRecommentedTask", "finishAllRecommentedTask", "Warning"):
-        # Bước 1: Kiểm tra finishAllRecommentedTask trước
-        eval_result = evaluate_recommended_tasks(token)
-        
-        if eval_result and eval_result.get("hasRecommended"):
-            # Nếu tất cả task được đề xuất đã completed → trả finishAllRecommentedTask
-            if eval_result.get("allCompleted"):
-                resp = _build_response_for_tag("finishAllRecommentedTask", context)
-                if resp:
-                    return resp
-            
-            # Bước 2: Nếu không phải finishAllRecommentedTask, kiểm tra finishPartOfRecommentedTask
-            # Chỉ xử lý khi tag là finishPartOfRecommentedTask (user báo đã làm recommented task)
-            if tag == "finishPartOfRecommentedTask":
-                # Ưu tiên: Kiểm tra từ recommended tasks (đã lưu trong DB, là các task tương lai)
-                if eval_result.get("anyCompleted"):
-                    # Đúng: có một phần task được đề xuất đã completed → trả finishPartOfRecommentedTask
-                    resp = _build_response_for_tag("finishPartOfRecommentedTask", context)
-                else:
-                    # Không đúng: chưa có task nào completed → trả Warning
-                    resp = _build_response_for_tag("Warning", context)
-                
-        if resp:
-            return resp
-        
-        # Fallback: nếu không có dữ liệu DB hoặc tag không phải finishPartOfRecommentedTask
-        if tag == "finishAllRecommentedTask":
-            resp = _build_response_for_tag("finishAllRecommentedTask", context)
-        elif tag == "finishPartOfRecommentedTask":
-            # Nếu không có dữ liệu DB, kiểm tra trạng thái task tương lai từ context
-            future_status = evaluate_future_tasks_status(context)
-            if future_status["has_future_tasks"]:
-                future_details = future_status["future_task_details"]
-                completed_future_tasks = [
-                    task for task in future_details 
-                    if task.get("status") == "completed"
-                ]
-                if len(completed_future_tasks) > 0:
-                    # Đúng: có một phần task tương lai đã completed → trả finishPartOfRecommentedTask
-                    resp = _build_response_for_tag("finishPartOfRecommentedTask", context)
-                else:
-                    # Không đúng: chưa có task tương lai nào completed → trả Warning
-                    resp = _build_response_for_tag("Warning", context)
-            else:
-                # Không có task tương lai, dùng intent mặc định
-                resp = _build_response_for_tag("finishPartOfRecommentedTask", context)
-        else:
-            resp = _build_response_for_tag("Warning", context)
-
-        if resp:
-            return resp
-
-    # 5. Tiến độ toàn team trong group (chỉ cho Product Owner/PM)
-    if tag == "teamProgress":
-        # Nếu thiếu thông tin group trong context, yêu cầu user chỉ định group
-        group_info = (context or {}).get("group") or {}
-        if not group_info.get("id") and not group_info.get("name"):
-            ask_resp = _build_response_for_tag("AskGroupName", context)
-            if ask_resp:
-                return ask_resp
-
-        progress = get_group_progress(token)
-        if not progress:
-            return "Chatbot chỉ hỗ trợ xem tiến độ team cho Product Owner/PM của group này, hoặc hiện chưa có dữ liệu task phù hợp."
-
-        total = progress.get("totalTasks", 0)
-        todo = progress.get("todo", {})
-        in_progress = progress.get("in_progress", {})
-        completed = progress.get("completed", {})
-        incomplete = progress.get("incomplete", {})
-
-        # Map sang placeholders cho intents
-        team_context = {
-            "team_total_tasks": total,
-            "team_todo_count": todo.get("count", 0),
-            "team_todo_percent": todo.get("percent", 0),
-            "team_inprogress_count": in_progress.get("count", 0),
-            "team_inprogress_percent": in_progress.get("percent", 0),
-            "team_completed_count": completed.get("count", 0),
-            "team_completed_percent": completed.get("percent", 0),
-            "team_incomplete_count": incomplete.get("count", 0),
-            "team_incomplete_percent": incomplete.get("percent", 0),
-        }
-
-        # Gộp vào context tạm cho replace_placeholders
-        merged_context = (context or {}).copy()
-        merged_context.setdefault("stats", {})
-        merged_context["stats"].update(team_context)
-
-        resp = _build_response_for_tag("teamProgress", merged_context)
-        if resp:
-            return resp + f"\n(Tổng số task trong group: {total})"
-
-    # 6. Tiến độ theo từng thành viên trong group (chỉ cho Product Owner/PM)
-    if tag == "memberProgress":
-        # Ở phiên bản đơn giản, tạm thời yêu cầu frontend/backend truyền sẵn memberId trong context
-        member_info = (context or {}).get("member") or {}
-        member_id = member_info.get("id") or ""
-        member_name = member_info.get("name") or "thành viên này"
-
-        progress = get_member_progress(token, member_id)
-        if not progress:
-            return "Chatbot chỉ hỗ trợ xem tiến độ theo thành viên cho Product Owner/PM của group này, hoặc hiện chưa có dữ liệu task phù hợp."
-
-        total = progress.get("totalTasks", 0)
-        todo = progress.get("todo", {})
-        in_progress = progress.get("in_progress", {})
-        completed = progress.get("completed", {})
-        incomplete = progress.get("incomplete", {})
-
-        member_context = {
-            "member_name": member_name,
-            "member_total_tasks": total,
-            "member_todo_count": todo.get("count", 0),
-            "member_todo_percent": todo.get("percent", 0),
-            "member_inprogress_count": in_progress.get("count", 0),
-            "member_inprogress_percent": in_progress.get("percent", 0),
-            "member_completed_count": completed.get("count", 0),
-            "member_completed_percent": completed.get("percent", 0),
-            "member_incomplete_count": incomplete.get("count", 0),
-            "member_incomplete_percent": incomplete.get("percent", 0),
-        }
-
-        merged_context = (context or {}).copy()
-        merged_context.setdefault("memberStats", {})
-        merged_context["memberStats"].update(member_context)
-
-        resp = _build_response_for_tag("memberProgress", merged_context)
-        if resp:
-            return resp + f"\n(Tổng số task của {member_name} trong group: {total})"
-
-    # 7. Mặc định: dùng intent được model dự đoán với context
-    resp = _build_response_for_tag(tag, context)
-    if resp:
-        return resp
+    _all_words_set = frozenset(all_words)
+    exact = {}
+    stems = {}
+    with torch.no_grad():
+        for intent in intents["intents"]:
+            for pattern in intent.get("patterns") or []:
+                sentence = tokenize(pattern)
+                key = _stem_key(sentence)
+                if key not in stems:
+                    stems[key] = _classify_with_model(sentence)
+                exact.setdefault(_normalize_text(pattern), stems[key])
+
+    _fast_path_exact = exact
+    _fast_path_stems = stems
+
+
+def _count_fast_path(name: str) -> None:
+    with _fast_path_lock:
+        _fast_path_stats[name] += 1
 
-    return "I do not understand..."
+
+def fast_path_stats():
+    """Số lần trúng/trượt fast path, dùng cho /metrics."""
+    with _fast_path_lock:
+        stats = dict(_fast_path_stats)
+    stats["exact_entries"] = len(_fast_path_exact)
+    stats["stem_entries"] = len(_fast_path_stems)
+    return stats
+
+
+def check_fast_path_parity():
+    """
+    So sánh kết quả fast path với model trên mọi pattern trong intents.json.
+    Trả về danh sách (pattern, kết quả fast path, kết quả model) bị lệch, rỗng nếu khớp hoàn toàn.
+    """
+    mismatches = []
+    with torch.no_grad():
+        for intent in intents["intents"]:
+            for pattern in intent.get("patterns") or []:
+                sentence = tokenize(pattern)
+                expected = _classify_with_model(sentence)
+                for result in (
+                    _fast_path_exact.get(_normalize_text(pattern), _MISS),
+                    _fast_path_stems.get(_stem_key(sentence), _MISS),
+                ):
+                    if result is not expected and result != expected:
+                        mismatches.append((pattern, result, expected))
+    return mismatches
+
+
+rebuild_fast_path()
+
+
+def classify(msg):
+    """
+    Phân loại câu của user thành tag.
+    Trả về None nếu độ tin cậy thấp (<= CONFIDENCE_THRESHOLD).
+    """
+    result = _fast_path_exact.get(_normalize_text(msg), _MISS)
+    if result is not _MISS:
+        _count_fast_path("exact_hits")
+        return result
+
+    sentence = tokenize(msg)
+    result = _fast_path_stems.get(_stem_key(sentence), _MISS)
+    if result is not _MISS:
+        _count_fast_path("stem_hits")
+        return result
+
+    _count_fast_path("misses")
+    return _classify_with_model(sentence)
+
+
+def get_handler(tag):
+    """Lấy handler cho tag (None = độ tin cậy thấp)."""
+    if tag is None:
+        return LOW_CONFIDENCE_HANDLER
+    return HANDLERS.get(tag) or IntentHandler("_handle_default", _handle_default, ("context",))
+
+
+def get_response(msg, context=None, token=None, session=None):
+    """
+    Lấy câu trả lời từ mô hình và apply context (thay placeholders nếu có),
+    đồng thời áp dụng các rule đặc biệt theo yêu cầu.
+    session: dict trạng thái hội thoại (xem session_store), được cập nhật tại chỗ.
+    """
+    return "\n\n".join(iter_response(msg, context=context, token=token, session=session))
+
+
+def iter_response(msg, context=None, token=None, session=None):
+    """
+    Giống get_response nhưng trả về từng phần của câu trả lời (generator)
+    ngay khi phần đó sẵn sàng, dùng cho endpoint streaming.
+    Các phần được nối với nhau bằng "\n\n" để ra câu trả lời đầy đủ.
+    """
+    return iter_response_for_tag(classify(msg), context=context, token=token, session=session)
+
+
+def iter_response_for_tag(tag, context=None, token=None, session=None, resources=None):
+    """
+    Render câu trả lời cho tag đã phân loại qua handler tương ứng.
+    resources: dữ liệu đã prefetch (xem prefetch_resources), thiếu resource nào thì handler tự lấy.
+    """
+    if session is not None:
+        session["last_tag"] = tag
+        session["turns"] = (session.get("turns") or 0) + 1
+
+    handler = get_handler(tag)
+    started = time.perf_counter()
+    try:
+        produced = False
+        for part in handler.func(tag, context, token, session, resources):
+            produced = True
+            yield part
+
+        # Handler không trả được gì -> dùng intent được model dự đoán, cuối cùng là câu mặc định
+        if not produced and handler.func is not _handle_default:
+            for part in _handle_default(tag, context, token, session, resources):
+                produced = True
+                yield part
+        if not produced:
+            yield LOW_CONFIDENCE_RESPONSE
+    finally:
+        _record_handler_timing(handler.name, time.perf_counter() - started)
 
 
 if __name__ == "__main__":
@@ -6,10 +6,64 @@ Cấu hình cho chatbot Flask.
 Có thể override bằng environment variables:
 - BACKEND_API_URL: URL base của backend Node (bao gồm /api), vd: http://localhost:8080/api
 - CHATBOT_DEBUG: "true"/"false" để bật log debug đơn giản
+- CHATBOT_SESSION_BACKEND: "memory" (mặc định) hoặc "redis"
+- CHATBOT_SESSION_REDIS_URL: URL Redis khi dùng backend "redis"
+- CHATBOT_SESSION_TTL: thời gian sống của một session (giây)
+- CHATBOT_SESSION_MAX_ENTRIES: số session tối đa giữ trong bộ nhớ mỗi worker
+- CHATBOT_SESSION_CONTEXT_MAX_AGE: tuổi tối đa (giây) của snapshot context được dùng lại, 0 để tắt
+- CHATBOT_CONTEXT_CACHE_MAX_ENTRIES: số context giữ lại cho request có điều kiện (ETag) mỗi worker
+- CHATBOT_BACKEND_TIMEOUT: timeout tối đa (giây) cho một lời gọi backend
+- CHATBOT_REQUEST_BUDGET: tổng thời gian (giây) cho mọi lời gọi backend trong 1 request, 0 để tắt
+- CHATBOT_BREAKER_FAILURE_THRESHOLD: số lỗi liên tiếp để circuit breaker chuyển sang open
+- CHATBOT_BREAKER_RECOVERY_TIMEOUT: thời gian (giây) breaker ở trạng thái open trước khi thử lại
+- CHATBOT_PROGRESS_CACHE_TTL: TTL (giây) của cache tiến độ group/thành viên dùng chung, 0 để tắt
+- CHATBOT_PROGRESS_AUTH_TTL: thời gian (giây) nhớ quyền xem tiến độ của một token với một group
+  (không vượt quá CHATBOT_PROGRESS_CACHE_TTL)
+- CHATBOT_PROGRESS_CACHE_MAX_ENTRIES: số entry tối đa của cache tiến độ mỗi worker
+- CHATBOT_TASK_LIST_LIMIT: số task tối đa liệt kê trong câu trả lời, 0 để không giới hạn
+- CHATBOT_TASK_LIST_ORDER: "dueDate" (mặc định) hoặc "priority", cách chọn task khi vượt giới hạn
+- CHATBOT_RATE_LIMIT_PER_SECOND: số request/giây cho mỗi user (token bucket), 0 để tắt
+- CHATBOT_RATE_LIMIT_BURST: số request tối đa user được gửi dồn một lúc
+- CHATBOT_ADMISSION_MAX_CONCURRENT: số request /predict xử lý đồng thời mỗi worker, 0 để tắt
+- CHATBOT_ADMISSION_QUEUE_SIZE: số request tối đa được chờ khi đã đủ slot xử lý
+- CHATBOT_ADMISSION_QUEUE_TIMEOUT: thời gian (giây) tối đa một request được chờ slot
+- CHATBOT_TORCH_THREADS: số thread torch (intra-op) mỗi worker gunicorn (xem gunicorn.conf.py)
+- CHATBOT_ADMIN_TOKEN: token cho các endpoint /admin/* (header X-Admin-Token), để trống để tắt
+- CHATBOT_PROFILING_ENABLED: bật endpoint /admin/profile/* và cProfile theo header X-Profile
+  (cần thêm CHATBOT_ADMIN_TOKEN), mặc định tắt
 """
 
 BACKEND_API_URL = os.getenv("BACKEND_API_URL", "http://localhost:8080/api")
 
 CHATBOT_DEBUG = os.getenv("CHATBOT_DEBUG", "false").lower() == "true"
 
+CHATBOT_SESSION_BACKEND = os.getenv("CHATBOT_SESSION_BACKEND", "memory").lower()
+CHATBOT_SESSION_REDIS_URL = os.getenv("CHATBOT_SESSION_REDIS_URL", "redis://localhost:6379/0")
+CHATBOT_SESSION_TTL = float(os.getenv("CHATBOT_SESSION_TTL", "1800"))
+CHATBOT_SESSION_MAX_ENTRIES = int(os.getenv("CHATBOT_SESSION_MAX_ENTRIES", "5000"))
+CHATBOT_SESSION_CONTEXT_MAX_AGE = float(os.getenv("CHATBOT_SESSION_CONTEXT_MAX_AGE", "15"))
 
+CHATBOT_CONTEXT_CACHE_MAX_ENTRIES = int(os.getenv("CHATBOT_CONTEXT_CACHE_MAX_ENTRIES", "1000"))
+
+CHATBOT_BACKEND_TIMEOUT = float(os.getenv("CHATBOT_BACKEND_TIMEOUT", "5"))
+CHATBOT_REQUEST_BUDGET = float(os.getenv("CHATBOT_REQUEST_BUDGET", "8"))
+CHATBOT_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CHATBOT_BREAKER_FAILURE_THRESHOLD", "5"))
+CHATBOT_BREAKER_RECOVERY_TIMEOUT = float(os.getenv("CHATBOT_BREAKER_RECOVERY_TIMEOUT", "30"))
+
+CHATBOT_PROGRESS_CACHE_TTL = float(os.getenv("CHATBOT_PROGRESS_CACHE_TTL", "30"))
+CHATBOT_PROGRESS_AUTH_TTL = float(os.getenv("CHATBOT_PROGRESS_AUTH_TTL", "30"))
+CHATBOT_PROGRESS_CACHE_MAX_ENTRIES = int(os.getenv("CHATBOT_PROGRESS_CACHE_MAX_ENTRIES", "2000"))
+
+CHATBOT_TASK_LIST_LIMIT = int(os.getenv("CHATBOT_TASK_LIST_LIMIT", "20"))
+CHATBOT_TASK_LIST_ORDER = os.getenv("CHATBOT_TASK_LIST_ORDER", "dueDate")
+
+CHATBOT_RATE_LIMIT_PER_SECOND = float(os.getenv("CHATBOT_RATE_LIMIT_PER_SECOND", "2"))
+CHATBOT_RATE_LIMIT_BURST = float(os.getenv("CHATBOT_RATE_LIMIT_BURST", "10"))
+CHATBOT_ADMISSION_MAX_CONCURRENT = int(os.getenv("CHATBOT_ADMISSION_MAX_CONCURRENT", "8"))
+CHATBOT_ADMISSION_QUEUE_SIZE = int(os.getenv("CHATBOT_ADMISSION_QUEUE_SIZE", "16"))
+CHATBOT_ADMISSION_QUEUE_TIMEOUT = float(os.getenv("CHATBOT_ADMISSION_QUEUE_TIMEOUT", "0.5"))
+
+CHATBOT_TORCH_THREADS = int(os.getenv("CHATBOT_TORCH_THREADS", "1"))
+
+CHATBOT_ADMIN_TOKEN = os.getenv("CHATBOT_ADMIN_TOKEN", "")
+CHATBOT_PROFILING_ENABLED = os.getenv("CHATBOT_PROFILING_ENABLED", "false").lower() == "true"
@@ -0,0 +1,57 @@
+from collections.abc import Mapping
+from typing import Any, Iterator, Optional
+
+"""
+View chỉ đọc ghép các field riêng của từng nhánh (overlay) lên context lấy từ backend.
+
+Thay cho context.copy() + sửa field: không copy context gốc, không thể ghi vào,
+và đọc được như dict thông thường (.get, [], in) nên dùng thẳng với
+replace_placeholders/format_task_list.
+"""
+
+
+class ContextView(Mapping):
+    """Mapping chỉ đọc: tra overlay trước, không có thì tra context gốc."""
+
+    __slots__ = ("_base", "_overlay")
+
+    def __init__(self, base: Optional[Mapping], overlay: Optional[Mapping] = None) -> None:
+        self._base = base if base is not None else {}
+        self._overlay = overlay if overlay is not None else {}
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._overlay:
+            return self._overlay[key]
+        return self._base[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._overlay or key in self._base
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._overlay
+        for key in self._base:
+            if key not in self._overlay:
+                yield key
+
+    def __len__(self) -> int:
+        return len(self._overlay) + sum(1 for key in self._base if key not in self._overlay)
+
+    def __bool__(self) -> bool:
+        return bool(self._overlay) or bool(self._base)
+
+    def __repr__(self) -> str:
+        return f"ContextView({dict(self)!r})"
+
+
+def overlay_context(context: Optional[Mapping], **fields: Any) -> ContextView:
+    """Tạo view của context với các field trong fields đè lên field cùng tên."""
+    return ContextView(context, fields)
+
+
+def overlay_nested(context: Optional[Mapping], key: str, **fields: Any) -> ContextView:
+    """
+    Tạo view của context trong đó context[key] (dict con, vd "stats") được ghép thêm fields,
+    thay cho setdefault(key, {}).update(fields) trên bản copy nông.
+    """
+    nested = (context or {}).get(key) or {}
+    return ContextView(context, {key: ContextView(nested, fields)})
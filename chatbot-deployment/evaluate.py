@@ -0,0 +1,203 @@
+import argparse
+import json
+import sys
+import time
+from collections import Counter, defaultdict
+from itertools import islice
+
+import torch
+
+import chat
+from nltk_utils import bag_of_words_batch, tokenize
+
+"""
+Đánh giá offline / replay cho classifier của chatbot.
+
+Đọc file JSONL (mỗi dòng 1 message), chạy theo từng batch qua bag-of-words + model:
+
+    {"message": "Hôm nay có những task gì?", "tag": "todayTask"}
+    {"message": "hi", "context": {...}}
+
+- "tag" (tùy chọn): nhãn đúng để tính accuracy và confusion matrix
+- "context" (tùy chọn): context đã ghi lại cho message đó (ưu tiên hơn --context)
+
+Báo cáo accuracy, confusion matrix, tỉ lệ độ tin cậy thấp (<= threshold) và số message/giây.
+Với --rules, chạy thêm các rule của get_response trên context ghi lại/--context mà không
+gọi backend (không truyền token nên mọi lời gọi backend đều bị bỏ qua).
+
+Ví dụ:
+    python evaluate.py traffic.jsonl --context context.json --rules --output replay.jsonl
+"""
+
+
+def _read_messages(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                print(f"skip line {line_no}: invalid JSON", file=sys.stderr)
+                continue
+            if isinstance(item, str):
+                item = {"message": item}
+            if not isinstance(item, dict) or not item.get("message"):
+                print(f"skip line {line_no}: missing message", file=sys.stderr)
+                continue
+            yield item
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def classify_batch(messages, threshold=chat.CONFIDENCE_THRESHOLD):
+    """Phân loại nhiều message 1 lần. Trả về [(tag dự đoán, xác suất, tự tin hay không)]."""
+    X = bag_of_words_batch([tokenize(msg) for msg in messages], chat.all_words)
+    with torch.no_grad():
+        output = chat.model(torch.from_numpy(X).to(chat.device))
+        probs = torch.softmax(output, dim=1)
+        best_probs, predicted = torch.max(probs, dim=1)
+    return [
+        (chat.tags[idx], prob, prob > threshold)
+        for idx, prob in zip(predicted.tolist(), best_probs.tolist())
+    ]
+
+
+def evaluate(path, batch_size=256, threshold=chat.CONFIDENCE_THRESHOLD, default_context=None,
+             run_rules=False, output=None):
+    total = 0
+    labeled = 0
+    correct = 0
+    low_confidence = 0
+    confusion = defaultdict(Counter)
+    classify_seconds = 0.0
+    rules_seconds = 0.0
+
+    for chunk in _chunks(_read_messages(path), batch_size):
+        started = time.perf_counter()
+        results = classify_batch([item["message"] for item in chunk], threshold)
+        classify_seconds += time.perf_counter() - started
+
+        for item, (tag, prob, confident) in zip(chunk, results):
+            total += 1
+            if not confident:
+                low_confidence += 1
+
+            # Message có độ tin cậy thấp được tính là dự đoán "None" (trả lời mặc định)
+            predicted = tag if confident else None
+            label = item.get("tag")
+            if label is not None:
+                labeled += 1
+                confusion[label][predicted] += 1
+                if predicted == label:
+                    correct += 1
+
+            if run_rules or output:
+                record = {
+                    "message": item["message"],
+                    "predicted": predicted,
+                    "model_tag": tag,
+                    "prob": round(prob, 4),
+                }
+                if label is not None:
+                    record["tag"] = label
+                if run_rules:
+                    context = item.get("context", default_context)
+                    started = time.perf_counter()
+                    record["answer"] = "\n\n".join(chat.iter_response_for_tag(predicted, context=context))
+                    rules_seconds += time.perf_counter() - started
+                if output:
+                    output.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    return {
+        "messages": total,
+        "labeled": labeled,
+        "accuracy": correct / labeled if labeled else None,
+        "low_confidence_rate": low_confidence / total if total else None,
+        "threshold": threshold,
+        "classify_messages_per_second": total / classify_seconds if classify_seconds else None,
+        "rules_messages_per_second": total / rules_seconds if run_rules and rules_seconds else None,
+        "confusion": {label: dict(preds) for label, preds in confusion.items()},
+    }
+
+
+def _format_confusion(confusion):
+    labels = sorted(confusion)
+    predicted = sorted({p for preds in confusion.values() for p in preds}, key=lambda p: (p is None, p or ""))
+    header = ["true \\ pred"] + [p if p is not None else "(low conf)" for p in predicted]
+    rows = [[label] + [str(confusion[label].get(p, 0)) for p in predicted] for label in labels]
+    widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+    return "\n".join("  ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in [header] + rows)
+
+
+def _print_report(report):
+    print(f"messages: {report['messages']}")
+    if report["accuracy"] is not None:
+        print(f"accuracy: {report['accuracy']:.4f} ({report['labeled']} labeled)")
+    if report["low_confidence_rate"] is not None:
+        print(f"low confidence (<= {report['threshold']}): {report['low_confidence_rate']:.2%}")
+    if report["classify_messages_per_second"]:
+        print(f"classify throughput: {report['classify_messages_per_second']:.0f} msg/s")
+    if report["rules_messages_per_second"]:
+        print(f"rules throughput: {report['rules_messages_per_second']:.0f} msg/s")
+    if report["confusion"]:
+        print("confusion matrix:")
+        print(_format_confusion(report["confusion"]))
+
+
+def _positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be >= 1, got {value}")
+    return number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline evaluation / replay for the chatbot classifier")
+    parser.add_argument("messages", help="JSONL file, one {\"message\", \"tag\"?, \"context\"?} per line")
+    parser.add_argument("--batch-size", type=_positive_int, default=256)
+    parser.add_argument("--threshold", type=float, default=chat.CONFIDENCE_THRESHOLD)
+    parser.add_argument("--context", help="JSON file with a recorded context used for lines without one")
+    parser.add_argument("--rules", action="store_true", help="also run get_response rules (no backend calls)")
+    parser.add_argument("--output", help="write per-message results as JSONL")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    default_context = None
+    if args.context:
+        with open(args.context, "r", encoding="utf-8") as f:
+            default_context = json.load(f)
+        # Chấp nhận cả response nguyên bản của /chatbot/context ({"data": {...}})
+        if isinstance(default_context, dict) and isinstance(default_context.get("data"), dict):
+            default_context = default_context["data"]
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else None
+    try:
+        report = evaluate(
+            args.messages,
+            batch_size=args.batch_size,
+            threshold=args.threshold,
+            default_context=default_context,
+            run_rules=args.rules,
+            output=output,
+        )
+    finally:
+        if output:
+            output.close()
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import multiprocessing
+import os
+
+"""
+Cấu hình gunicorn cho môi trường production (gunicorn tự đọc file này khi chạy trong thư mục này):
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Mỗi request /predict gồm 1 lần chạy model rất nhỏ (CPU, vài trăm µs, giữ GIL) và 0-4 lời gọi
+backend (I/O, tới vài giây). Vì vậy:
+- worker_class "gthread": mỗi worker có nhiều thread để chờ backend song song, phần CPU bị
+  GIL giới hạn nên số worker (process) mới quyết định throughput của phần model.
+- workers = số core / số thread torch: mỗi worker dùng trọn 1 core (hoặc CHATBOT_TORCH_THREADS core)
+  cho phần CPU, không tranh core với nhau.
+- CHATBOT_TORCH_THREADS mặc định 1: model quá nhỏ, chia 1 phép nhân ma trận cho nhiều thread
+  chỉ thêm chi phí đồng bộ và gây oversubscription khi có nhiều worker.
+- threads = CHATBOT_ADMISSION_MAX_CONCURRENT + CHATBOT_ADMISSION_QUEUE_SIZE + 4: mỗi request
+  đang xử lý hoặc đang chờ trong hàng đợi admission chiếm 1 thread, nên cần đủ thread cho cả hai
+  để hàng đợi admission (có timeout) thật sự đầy; thêm vài thread để request vượt quá hàng đợi
+  vẫn tới được admission và nhận 429 ngay, thay vì nằm chờ trong backlog của gunicorn.
+- preload_app: load model/intents 1 lần trong master rồi fork, các worker dùng chung bộ nhớ
+  (copy-on-write) và khởi động nhanh hơn.
+- max_requests (+ jitter): định kỳ thay worker để giới hạn bộ nhớ tăng dần (cache, phân mảnh heap),
+  jitter để các worker không restart cùng lúc.
+
+Override bằng environment variables:
+- PORT: cổng lắng nghe (mặc định 5000)
+- WEB_CONCURRENCY: số worker
+- GUNICORN_THREADS: số thread mỗi worker
+- GUNICORN_TIMEOUT, GUNICORN_GRACEFUL_TIMEOUT, GUNICORN_KEEPALIVE: các timeout (giây)
+- GUNICORN_MAX_REQUESTS, GUNICORN_MAX_REQUESTS_JITTER: recycle worker, 0 để tắt
+- CHATBOT_TORCH_THREADS: số thread torch (intra-op) mỗi worker
+
+Khi đổi cấu hình phần cứng, đo lại lưới WEB_CONCURRENCY x GUNICORN_THREADS x CHATBOT_TORCH_THREADS
+với chính file cấu hình này rồi so p50/p99 và req/s:
+
+    python benchmarks/bench_gunicorn.py --workers 1 2 4 --threads 8 28 --torch-threads 1 2 --clients 64
+"""
+
+# Master không chạy phép tính song song nào: tránh tạo thread pool OpenMP/MKL trước khi fork
+# (pool tạo trong master không dùng được trong worker). Mỗi worker tự đặt số thread ở post_fork.
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("MKL_NUM_THREADS", "1")
+
+from config import (  # noqa: E402
+    CHATBOT_ADMISSION_MAX_CONCURRENT,
+    CHATBOT_ADMISSION_QUEUE_SIZE,
+    CHATBOT_TORCH_THREADS,
+)
+
+
+def _cpu_count():
+    """Số core process được dùng (tính cả giới hạn affinity/cgroup cpuset của container)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+def _default_workers():
+    return max(1, _cpu_count() // max(1, CHATBOT_TORCH_THREADS))
+
+
+# Thread dư để request vượt quá hàng đợi admission được từ chối (429) ngay
+_REJECT_THREADS = 4
+
+
+def _default_threads():
+    """Đủ thread cho mọi request admission control cho phép cùng lúc (đang xử lý + đang chờ)."""
+    if CHATBOT_ADMISSION_MAX_CONCURRENT > 0:
+        return CHATBOT_ADMISSION_MAX_CONCURRENT + max(CHATBOT_ADMISSION_QUEUE_SIZE, 0) + _REJECT_THREADS
+    return 8
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY", str(_default_workers())))
+threads = int(os.getenv("GUNICORN_THREADS", str(_default_threads())))
+
+preload_app = True
+
+# Request dài nhất: latency budget backend (CHATBOT_REQUEST_BUDGET) + chạy model,
+# timeout phải lớn hơn để không kill worker đang trả lời hợp lệ
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+# Heartbeat của worker ghi vào tmpfs thay vì overlay filesystem của container
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):  # pylint: disable=unused-argument
+    import torch  # pylint: disable=import-outside-toplevel
+
+    torch.set_num_threads(max(1, CHATBOT_TORCH_THREADS))
+    server.log.info(
+        "worker %s: %s threads, torch threads %s", worker.pid, threads, torch.get_num_threads()
+    )
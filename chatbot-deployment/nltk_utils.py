@@ -48,3 +48,18 @@ def bag_of_words(tokenized_sentence, words):
             bag[idx] = 1
 
     return bag
+
+
+def bag_of_words_batch(tokenized_sentences, words):
+    """
+    return bag of words matrix for many sentences at once:
+    row i is bag_of_words(tokenized_sentences[i], words)
+    """
+    word_index = {w: idx for idx, w in enumerate(words)}
+    bags = np.zeros((len(tokenized_sentences), len(words)), dtype=np.float32)
+    for row, sentence in enumerate(tokenized_sentences):
+        for word in sentence:
+            idx = word_index.get(stem(word))
+            if idx is not None:
+                bags[row, idx] = 1
+    return bags
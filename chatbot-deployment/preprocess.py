@@ -0,0 +1,181 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Tuple
+
+import nltk
+import numpy as np
+
+from nltk_utils import stem, tokenize
+
+"""
+Tiền xử lý corpus huấn luyện (tokenize + stem pattern trong intents.json) có cache trên đĩa.
+
+- Kết quả đầy đủ (all_words, tags, xy, X_train, y_train) được cache theo hash của
+  intents.json + TOKENIZER_VERSION, các lần chạy sau chỉ cần load lại.
+- Token/stem của từng pattern được cache riêng theo nội dung pattern, nên khi chỉ
+  vài intent thay đổi thì chỉ các pattern mới/đã sửa phải tokenize lại.
+
+Thư mục cache mặc định: .cache/preprocess (override bằng CHATBOT_PREPROCESS_CACHE_DIR).
+Cache chỉ để tăng tốc: không tạo/ghi được thư mục cache thì chỉ log cảnh báo và build bình thường.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Tăng khi thay đổi cách tokenize/stem/encode để bỏ cache cũ
+TOKENIZER_VERSION = f"punkt_tab-porter-v1-nltk{nltk.__version__}"
+
+IGNORE_WORDS = ['?', '.', '!']
+
+CACHE_DIR = os.getenv("CHATBOT_PREPROCESS_CACHE_DIR", os.path.join(".cache", "preprocess"))
+
+
+def _intents_hash(intents_bytes: bytes) -> str:
+    digest = hashlib.sha256()
+    digest.update(TOKENIZER_VERSION.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(intents_bytes)
+    return digest.hexdigest()[:32]
+
+
+def _pattern_cache_path(cache_dir: str) -> str:
+    version = hashlib.sha256(TOKENIZER_VERSION.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_dir, f"patterns-{version}.json")
+
+
+def _load_json(path: str) -> Any:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomic(path: str, write) -> None:
+    """
+    Ghi ra file tạm rồi đổi tên, tránh để lại cache hỏng khi nhiều job chạy song song.
+    Lỗi ghi (thư mục read-only, hết dung lượng...) chỉ được log lại.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except OSError:
+        logger.warning("could not write preprocess cache %s, continuing without it", path, exc_info=True)
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def _dump_json(f, data: Any) -> None:
+    f.write(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+
+def _process_patterns(intents: Dict[str, Any], cache_dir: str) -> Tuple[List[Tuple[List[str], List[str], str]], int]:
+    """
+    Tokenize + stem mọi pattern, dùng lại kết quả đã cache theo nội dung pattern.
+    Trả về ([(tokens, stems, tag)], số pattern phải xử lý mới).
+    """
+    path = _pattern_cache_path(cache_dir)
+    cached = _load_json(path) or {}
+    processed = []
+    fresh = 0
+    used = {}
+    for intent in intents['intents']:
+        tag = intent['tag']
+        for pattern in intent['patterns']:
+            entry = cached.get(pattern)
+            if entry is None:
+                tokens = tokenize(pattern)
+                entry = {"tokens": tokens, "stems": [stem(w) for w in tokens]}
+                fresh += 1
+            used[pattern] = entry
+            processed.append((entry["tokens"], entry["stems"], tag))
+
+    if fresh or len(used) != len(cached):
+        # Chỉ giữ pattern còn dùng để cache không phình mãi
+        _write_atomic(path, lambda f: _dump_json(f, used))
+    return processed, fresh
+
+
+def build_corpus(intents: Dict[str, Any], cache_dir: str = CACHE_DIR) -> Dict[str, Any]:
+    """Tạo all_words, tags, xy, X_train, y_train giống train.py (có dùng cache theo pattern)."""
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError:
+        logger.warning("could not create preprocess cache dir %s", cache_dir, exc_info=True)
+    processed, fresh = _process_patterns(intents, cache_dir)
+
+    tags = sorted(set(intent['tag'] for intent in intents['intents']))
+    # stem and lower each word
+    all_words = sorted(set(
+        stemmed
+        for tokens, stems, _ in processed
+        for word, stemmed in zip(tokens, stems)
+        if word not in IGNORE_WORDS
+    ))
+
+    # X: bag of words (1 nếu stem của pattern có trong vocabulary), y: index của tag
+    word_index = {w: i for i, w in enumerate(all_words)}
+    tag_index = {t: i for i, t in enumerate(tags)}
+    X_train = np.zeros((len(processed), len(all_words)), dtype=np.float32)
+    y_train = np.zeros(len(processed), dtype=np.int64)
+    for row, (_, stems, tag) in enumerate(processed):
+        for stemmed in stems:
+            col = word_index.get(stemmed)
+            if col is not None:
+                X_train[row, col] = 1
+        y_train[row] = tag_index[tag]
+
+    return {
+        "all_words": all_words,
+        "tags": tags,
+        "xy": [(tokens, tag) for tokens, _, tag in processed],
+        "X_train": X_train,
+        "y_train": y_train,
+        "fresh_patterns": fresh,
+    }
+
+
+def load_corpus(intents_path: str = 'intents.json', cache_dir: str = CACHE_DIR) -> Dict[str, Any]:
+    """
+    Load corpus đã tiền xử lý từ cache nếu intents.json và tokenizer không đổi,
+    ngược lại build lại (chỉ xử lý các pattern mới) rồi ghi cache.
+    """
+    with open(intents_path, 'rb') as f:
+        intents_bytes = f.read()
+    key = _intents_hash(intents_bytes)
+    meta_path = os.path.join(cache_dir, f"corpus-{key}.json")
+    arrays_path = os.path.join(cache_dir, f"corpus-{key}.npz")
+
+    meta = _load_json(meta_path)
+    if meta is not None and os.path.exists(arrays_path):
+        with np.load(arrays_path) as arrays:
+            return {
+                "all_words": meta["all_words"],
+                "tags": meta["tags"],
+                "xy": [(tokens, tag) for tokens, tag in meta["xy"]],
+                "X_train": arrays["X_train"],
+                "y_train": arrays["y_train"],
+                "fresh_patterns": 0,
+                "cache_hit": True,
+            }
+
+    intents = json.loads(intents_bytes.decode('utf-8'))
+    corpus = build_corpus(intents, cache_dir)
+
+    _write_atomic(
+        arrays_path,
+        lambda f: np.savez_compressed(f, X_train=corpus["X_train"], y_train=corpus["y_train"]),
+    )
+    _write_atomic(meta_path, lambda f: _dump_json(f, {
+        "tokenizer_version": TOKENIZER_VERSION,
+        "all_words": corpus["all_words"],
+        "tags": corpus["tags"],
+        "xy": corpus["xy"],
+    }))
+    corpus["cache_hit"] = False
+    return corpus
@@ -0,0 +1,144 @@
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+"""
+Profiler dùng khi debug latency trên worker production.
+
+- sample_stacks: sampling profiler, cứ mỗi `interval` giây chụp stack của mọi thread
+  (sys._current_frames) trong `duration` giây, trả về collapsed stacks
+  ("frame;frame;frame count" mỗi dòng) dùng trực tiếp được với flamegraph.pl/speedscope.
+- RequestProfiler: cProfile cho đúng 1 request (bật theo header), giữ lại vài kết quả gần nhất.
+
+Chỉ được dùng khi CHATBOT_PROFILING_ENABLED bật (xem app.py), khi tắt không có hook nào chạy.
+"""
+
+MAX_SAMPLE_DURATION = 60.0
+MIN_SAMPLE_INTERVAL = 0.001
+
+# Chỉ cho 1 phiên sampling chạy tại 1 thời điểm trong mỗi worker
+_sampling_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Đang có một phiên sampling khác chạy trên worker này."""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+def _collapse(frame, thread_name: str) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    # collapsed stack: từ gốc tới lá, ngăn cách bằng ";"
+    return ";".join(reversed(labels)).replace("\n", " ")
+
+
+def _clamp(value: float, low: float, high: float) -> float:
+    # "not value >= low" để nan cũng bị đưa về low
+    if not value >= low:
+        return low
+    return min(value, high)
+
+
+def sample_stacks(duration: float, interval: float = 0.005) -> Dict[str, Any]:
+    """
+    Lấy mẫu stack của mọi thread (trừ thread đang sampling) trong `duration` giây.
+    Trả về {"samples", "duration", "interval", "collapsed"}; raise ProfilerBusy nếu đang bận.
+    """
+    duration = _clamp(duration, 0.0, MAX_SAMPLE_DURATION)
+    interval = _clamp(interval, MIN_SAMPLE_INTERVAL, MAX_SAMPLE_DURATION)
+    if not _sampling_lock.acquire(blocking=False):
+        raise ProfilerBusy()
+
+    try:
+        own_id = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = 0
+        started = time.monotonic()
+        deadline = started + duration
+        while True:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():  # pylint: disable=protected-access
+                if thread_id == own_id:
+                    continue
+                stacks[_collapse(frame, names.get(thread_id, f"thread-{thread_id}"))] += 1
+            samples += 1
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(interval)
+    finally:
+        _sampling_lock.release()
+
+    collapsed = "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+    return {
+        "samples": samples,
+        "duration": round(time.monotonic() - started, 3),
+        "interval": interval,
+        "collapsed": collapsed,
+    }
+
+
+class RequestProfiler:
+    """cProfile cho từng request riêng lẻ, giữ tối đa `max_results` kết quả gần nhất."""
+
+    def __init__(self, max_results: int = 20, top: int = 40) -> None:
+        self.max_results = max_results
+        self.top = top
+        self._results: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def start() -> Tuple[str, cProfile.Profile]:
+        """Bật cProfile cho thread hiện tại, trả về (id để xem lại kết quả, profile)."""
+        profile = cProfile.Profile()
+        profile.enable()
+        return uuid.uuid4().hex[:12], profile
+
+    def finish(self, profile_id: str, profile: cProfile.Profile, path: str, sort: str = "cumulative") -> None:
+        """Dừng profile và lưu bảng pstats (top hàm theo `sort`)."""
+        profile.disable()
+        output = io.StringIO()
+        stats = pstats.Stats(profile, stream=output)
+        try:
+            stats.sort_stats(sort)
+        except KeyError:
+            stats.sort_stats("cumulative")
+        stats.print_stats(self.top)
+
+        with self._lock:
+            self._results[profile_id] = {
+                "id": profile_id,
+                "path": path,
+                "created_at": time.time(),
+                "total_calls": stats.total_calls,
+                "total_time": round(stats.total_tt, 6),
+                "stats": output.getvalue(),
+            }
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._results.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {key: value for key, value in result.items() if key != "stats"}
+                for result in reversed(self._results.values())
+            ]
+
+
+request_profiler = RequestProfiler()
@@ -0,0 +1,215 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import (
+    CHATBOT_BACKEND_TIMEOUT,
+    CHATBOT_PROGRESS_AUTH_TTL,
+    CHATBOT_PROGRESS_CACHE_MAX_ENTRIES,
+    CHATBOT_PROGRESS_CACHE_TTL,
+)
+from resilience import remaining_budget
+from session_store import hash_token
+from utils import get_group_progress, get_member_progress
+
+"""
+Cache tiến độ group/thành viên (teamProgress/memberProgress) dùng chung giữa các user.
+
+- Dữ liệu được cache theo group ID (và member ID), TTL ngắn.
+- Một user chỉ được đọc dữ liệu cache của group G sau khi chính token của user đó
+  đã lấy thành công tiến độ của G từ backend (backend kiểm tra quyền PO/PM),
+  quyền này được nhớ trong CHATBOT_PROGRESS_AUTH_TTL giây (tối đa bằng TTL của dữ liệu, nên
+  user bị mất quyền không đọc được dữ liệu cache lâu hơn thời gian dữ liệu đó có thể cũ).
+- Chỉ lưu kết quả khi backend xác nhận groupId trong response trùng với group trong
+  context, nên dữ liệu không bao giờ bị ghi nhầm sang group khác.
+- Nhiều request cùng lúc cho cùng 1 key chỉ gọi backend 1 lần (request coalescing);
+  request đi kèm chỉ nhận kết quả đã được xác nhận đúng group, nếu không thì tự gọi
+  backend bằng token của mình.
+- invalidate_group() xóa cache của group khi dữ liệu task thay đổi.
+"""
+
+
+class _InFlight:
+    __slots__ = ("event", "result", "shared")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        # True khi kết quả đã được lưu cho đúng group, chỉ khi đó mới chia cho request đi kèm
+        self.shared = False
+
+
+class ProgressCache:
+    """Cache TTL dùng chung, có kiểm soát quyền theo token và gộp các request trùng key."""
+
+    def __init__(self, ttl_seconds: float, auth_ttl_seconds: float, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        # Quyền không được sống lâu hơn dữ liệu: mỗi lần dữ liệu hết hạn, user phải được
+        # backend xác nhận lại quyền (hoặc dùng quyền vừa được xác nhận trong TTL đó)
+        self.auth_ttl_seconds = min(auth_ttl_seconds, ttl_seconds)
+        self.max_entries = max_entries
+        # (kind, group_id, member_id) -> (expires_at, data)
+        self._data: "OrderedDict[Tuple[str, str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # (token_hash, kind, group_id) -> expires_at
+        self._authorized: "OrderedDict[Tuple[str, str, str], float]" = OrderedDict()
+        self._in_flight: Dict[Any, _InFlight] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "invalidations": 0}
+
+    def get_or_fetch(
+        self,
+        kind: str,
+        group_id: str,
+        member_id: str,
+        token: Optional[str],
+        fetch: Callable[[], Optional[Dict[str, Any]]],
+    ) -> Optional[Dict[str, Any]]:
+        data_key = (kind, group_id, member_id)
+        auth_key = (hash_token(token), kind, group_id)
+        now = time.monotonic()
+
+        with self._lock:
+            authorized = self._authorized.get(auth_key, 0) > now
+            if not authorized:
+                self._authorized.pop(auth_key, None)
+            entry = self._data.get(data_key)
+            if authorized and entry and entry[0] > now:
+                self._data.move_to_end(data_key)
+                self._stats["hits"] += 1
+                return entry[1]
+            self._stats["misses"] += 1
+
+            # User đã có quyền dùng chung 1 lời gọi refresh; user chưa có quyền phải
+            # tự gọi backend bằng token của mình (gộp theo token)
+            flight_key = data_key if authorized else (data_key, auth_key[0])
+            flight = self._in_flight.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = _InFlight()
+                self._in_flight[flight_key] = flight
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            if not flight.event.wait(self._follower_wait()):
+                # Hết thời gian chờ (thường do latency budget của request): coi như lời gọi
+                # backend bị timeout, không gọi thêm và không đụng tới quyền đã nhớ
+                return None
+            if flight.shared:
+                return flight.result
+            # Leader lỗi, bị từ chối hoặc backend trả group khác (context cũ):
+            # không dùng kết quả của token khác, tự gọi bằng token của mình
+            result = fetch()
+            self._store(data_key, auth_key, group_id, result)
+            return result
+
+        try:
+            # Leader luôn nhận kết quả của chính token mình (giống gọi backend trực tiếp)
+            result = fetch()
+            if self._store(data_key, auth_key, group_id, result):
+                flight.result = result
+                flight.shared = True
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(flight_key, None)
+            flight.event.set()
+
+    @staticmethod
+    def _follower_wait() -> float:
+        """Thời gian request đi kèm chờ leader: không quá 1 lời gọi backend và budget còn lại."""
+        wait = CHATBOT_BACKEND_TIMEOUT + 1
+        remaining = remaining_budget()
+        if remaining is not None:
+            wait = min(wait, remaining)
+        return wait
+
+    def _store(
+        self,
+        data_key: Tuple[str, str, str],
+        auth_key: Tuple[str, str, str],
+        group_id: str,
+        result: Optional[Dict[str, Any]],
+    ) -> bool:
+        """Lưu kết quả nếu backend xác nhận đúng group; trả về True nếu đã lưu."""
+        with self._lock:
+            if not result:
+                # Backend từ chối (không phải PO/PM) hoặc lỗi: bỏ quyền đã nhớ
+                self._authorized.pop(auth_key, None)
+                return False
+            if str(result.get("groupId") or "") != group_id:
+                return False
+
+            now = time.monotonic()
+            self._data[data_key] = (now + self.ttl_seconds, result)
+            self._data.move_to_end(data_key)
+            self._authorized[auth_key] = now + self.auth_ttl_seconds
+            self._authorized.move_to_end(auth_key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            while len(self._authorized) > self.max_entries:
+                self._authorized.popitem(last=False)
+            return True
+
+    def invalidate_group(self, group_id: str) -> int:
+        """Xóa mọi dữ liệu cache (team và thành viên) của group, trả về số entry đã xóa."""
+        with self._lock:
+            keys = [key for key in self._data if key[1] == group_id]
+            for key in keys:
+                del self._data[key]
+            self._stats["invalidations"] += 1
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._authorized.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._data)
+            return stats
+
+
+progress_cache = ProgressCache(
+    CHATBOT_PROGRESS_CACHE_TTL,
+    CHATBOT_PROGRESS_AUTH_TTL,
+    CHATBOT_PROGRESS_CACHE_MAX_ENTRIES,
+)
+
+
+def _group_id_from_context(context: Optional[Dict[str, Any]]) -> str:
+    return str(((context or {}).get("group") or {}).get("id") or "")
+
+
+def get_cached_group_progress(token: Optional[str], context: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """get_group_progress qua cache dùng chung; không có group ID thì gọi thẳng backend."""
+    group_id = _group_id_from_context(context)
+    if not token or not group_id or CHATBOT_PROGRESS_CACHE_TTL <= 0:
+        return get_group_progress(token)
+    return progress_cache.get_or_fetch("group", group_id, "", token, lambda: get_group_progress(token))
+
+
+def get_cached_member_progress(
+    token: Optional[str],
+    context: Optional[Dict[str, Any]],
+    member_id: str,
+) -> Optional[Dict[str, Any]]:
+    """get_member_progress qua cache dùng chung; không có group ID thì gọi thẳng backend."""
+    group_id = _group_id_from_context(context)
+    if not token or not group_id or not member_id or CHATBOT_PROGRESS_CACHE_TTL <= 0:
+        return get_member_progress(token, member_id)
+    return progress_cache.get_or_fetch(
+        "member",
+        group_id,
+        member_id,
+        token,
+        lambda: get_member_progress(token, member_id),
+    )
+
+
+def invalidate_group(group_id: str) -> int:
+    """Hook để xóa cache tiến độ của group (vd khi task trong group thay đổi)."""
+    return progress_cache.invalidate_group(str(group_id))
@@ -0,0 +1,143 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from config import (
+    CHATBOT_BACKEND_TIMEOUT,
+    CHATBOT_BREAKER_FAILURE_THRESHOLD,
+    CHATBOT_BREAKER_RECOVERY_TIMEOUT,
+)
+
+"""
+Circuit breaker theo từng endpoint backend và latency budget cho mỗi request /predict.
+
+- Circuit breaker: sau N lỗi liên tiếp (timeout, lỗi kết nối, 5xx) endpoint chuyển sang
+  "open" và mọi lời gọi bị bỏ qua ngay; hết recovery_timeout thì cho 1 request thử
+  ("half_open"), thành công thì "closed" lại, lỗi thì "open" tiếp.
+- Latency budget: tổng thời gian mà tất cả lời gọi backend trong 1 request được phép dùng.
+  Timeout của mỗi lời gọi = min(CHATBOT_BACKEND_TIMEOUT, thời gian còn lại).
+"""
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Circuit breaker đơn giản (closed/open/half-open), an toàn khi dùng đa luồng."""
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._state == STATE_OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_timeout:
+                    self._rejected += 1
+                    return False
+                self._state = STATE_HALF_OPEN
+                self._trial_in_flight = False
+
+            if self._state == STATE_HALF_OPEN:
+                # Chỉ cho đúng 1 request thử trong trạng thái half-open
+                if self._trial_in_flight:
+                    self._rejected += 1
+                    return False
+                self._trial_in_flight = True
+
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = STATE_CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == STATE_HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = STATE_OPEN
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Lời gọi kết thúc mà không cho biết endpoint lỗi hay không: chỉ trả lại lượt thử half-open."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "rejected": self._rejected,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Lấy (hoặc tạo) circuit breaker cho một endpoint backend."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                CHATBOT_BREAKER_FAILURE_THRESHOLD,
+                CHATBOT_BREAKER_RECOVERY_TIMEOUT,
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """Trạng thái của tất cả circuit breaker, dùng cho /metrics."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+# Deadline (time.monotonic()) của request hiện tại, None nếu không giới hạn
+_request_deadline: ContextVar[Optional[float]] = ContextVar("chatbot_request_deadline", default=None)
+
+
+def start_latency_budget(seconds: float) -> None:
+    """Bắt đầu latency budget cho request hiện tại (<= 0 để tắt)."""
+    _request_deadline.set(time.monotonic() + seconds if seconds > 0 else None)
+
+
+def clear_latency_budget() -> None:
+    _request_deadline.set(None)
+
+
+def remaining_budget() -> Optional[float]:
+    """Số giây còn lại của budget, None nếu không giới hạn."""
+    deadline = _request_deadline.get()
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.0)
+
+
+def backend_timeout() -> Optional[float]:
+    """
+    Timeout cho lời gọi backend tiếp theo.
+    Trả về None nếu budget đã hết (không nên gọi backend nữa).
+    """
+    remaining = remaining_budget()
+    if remaining is None:
+        return CHATBOT_BACKEND_TIMEOUT
+    if remaining <= 0.05:
+        return None
+    return min(CHATBOT_BACKEND_TIMEOUT, remaining)
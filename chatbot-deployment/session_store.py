@@ -0,0 +1,210 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from config import (
+    CHATBOT_SESSION_BACKEND,
+    CHATBOT_SESSION_MAX_ENTRIES,
+    CHATBOT_SESSION_REDIS_URL,
+    CHATBOT_SESSION_TTL,
+)
+from task_records import json_default
+
+"""
+Session store phía server cho chatbot.
+
+Mỗi session (theo session_id do frontend gửi lên) giữ lại:
+- context: snapshot context lấy từ backend ở lượt trước
+- context_fetched_at: thời điểm lấy snapshot (time.time())
+- token_hash: hash của token đã dùng để lấy snapshot (không lưu token gốc)
+- recommended_task_ids: danh sách task đã lưu làm "task được đề xuất" gần nhất
+- last_tag: intent của lượt trước (dialog state)
+- turns: số lượt đã trao đổi
+
+Nhờ vậy các lượt liên tiếp có thể dùng lại dữ liệu thay vì gọi lại backend.
+Session chỉ là tối ưu: store lỗi (vd Redis down) thì request tiếp tục với session rỗng.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """Interface chung cho các backend lưu session."""
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def set(self, session_id: str, state: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Lưu session trong bộ nhớ process, có TTL và giới hạn số session (LRU).
+    An toàn khi dùng từ nhiều thread trong cùng một worker.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._evictions = 0
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            expires_at, state = entry
+            if expires_at <= now:
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return dict(state)
+
+    def set(self, session_id: str, state: Dict[str, Any]) -> None:
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[session_id] = (expires_at, dict(state))
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._entries),
+                "max_entries": self.max_entries,
+                "evictions": self._evictions,
+            }
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Lưu session qua một client tương thích Redis (cần get/setex/delete).
+    TTL và giới hạn bộ nhớ do server Redis đảm nhận (maxmemory-policy).
+    """
+
+    def __init__(self, client: Any, ttl_seconds: float, prefix: str = "chatbot:session:") -> None:
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raw = self.client.get(self._key(session_id))
+        if raw is None:
+            return None
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+        try:
+            state = json.loads(raw)
+        except ValueError:
+            return None
+        return state if isinstance(state, dict) else None
+
+    def set(self, session_id: str, state: Dict[str, Any]) -> None:
+        payload = json.dumps(state, ensure_ascii=False, default=json_default)
+        self.client.setex(self._key(session_id), max(int(self.ttl_seconds), 1), payload)
+
+    def delete(self, session_id: str) -> None:
+        self.client.delete(self._key(session_id))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis"}
+
+
+def hash_token(token: Optional[str]) -> str:
+    """Hash token để so khớp session mà không giữ token gốc trong store."""
+    if not token:
+        return ""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def get_cached_context(
+    state: Optional[Dict[str, Any]],
+    token: Optional[str],
+    max_age: float,
+) -> Optional[Dict[str, Any]]:
+    """
+    Trả về snapshot context trong session nếu còn mới và thuộc cùng token,
+    ngược lại trả về None (cần gọi backend lấy lại).
+    """
+    if not state or not token or max_age <= 0:
+        return None
+    if state.get("token_hash") != hash_token(token):
+        return None
+    fetched_at = state.get("context_fetched_at") or 0
+    if time.time() - fetched_at > max_age:
+        return None
+    return state.get("context")
+
+
+def remember_context(state: Dict[str, Any], token: Optional[str], context: Optional[Dict[str, Any]]) -> None:
+    """Ghi snapshot context vừa lấy từ backend vào session."""
+    if not context:
+        return
+    state["context"] = context
+    state["context_fetched_at"] = time.time()
+    state["token_hash"] = hash_token(token)
+
+
+def create_session_store() -> SessionStore:
+    """Tạo session store theo cấu hình CHATBOT_SESSION_BACKEND."""
+    if CHATBOT_SESSION_BACKEND == "redis":
+        try:
+            import redis  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            logger.error(
+                "CHATBOT_SESSION_BACKEND=redis but the redis package is not installed"
+                " (pip install redis); falling back to the in-memory session store"
+            )
+            return InMemorySessionStore(CHATBOT_SESSION_TTL, CHATBOT_SESSION_MAX_ENTRIES)
+
+        client = redis.Redis.from_url(CHATBOT_SESSION_REDIS_URL)
+        return RedisSessionStore(client, CHATBOT_SESSION_TTL)
+    return InMemorySessionStore(CHATBOT_SESSION_TTL, CHATBOT_SESSION_MAX_ENTRIES)
+
+
+session_store = create_session_store()
+
+
+def load_session(session_id: Optional[str]) -> Dict[str, Any]:
+    """Đọc session từ store; không có session_id, không tìm thấy hoặc store lỗi thì trả về {}."""
+    if not session_id:
+        return {}
+    try:
+        return session_store.get(session_id) or {}
+    except Exception:  # pylint: disable=broad-except
+        logger.warning("session store get failed, continuing without session", exc_info=True)
+        return {}
+
+
+def save_session(session_id: Optional[str], state: Dict[str, Any]) -> None:
+    """Ghi session vào store; lỗi của store chỉ được log lại, không làm hỏng request."""
+    if not session_id:
+        return
+    try:
+        session_store.set(session_id, state)
+    except Exception:  # pylint: disable=broad-except
+        logger.warning("session store set failed, session not saved", exc_info=True)
@@ -0,0 +1,141 @@
+import sys
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Tuple
+
+"""
+Bản ghi task gọn nhẹ cho context lấy từ backend (activeTaskDetails/todayTaskDetails/futureTaskDetails).
+
+- TaskRecord dùng __slots__ thay cho dict, các chuỗi status/priority được intern.
+- Cùng 1 task xuất hiện ở nhiều danh sách (active = today + future) dùng chung 1 bản ghi,
+  các danh sách title (activeTasks, todayTasks, ...) dùng chung chuỗi title với bản ghi.
+- TasksInfo (dict của field "tasks") giữ sẵn TaskSummary: tập id và số lượng theo status
+  của từng danh sách để kiểm tra hoàn thành trong O(1).
+
+TaskRecord vẫn có .get() như dict và là dataclass nên jsonify của Flask serialize được.
+"""
+
+_LIST_KEYS = (
+    ("active", "activeTasks", "activeTaskDetails"),
+    ("today", "todayTasks", "todayTaskDetails"),
+    ("future", "futureTasks", "futureTaskDetails"),
+)
+
+_RECORD_FIELDS = frozenset(("id", "title", "status", "priority", "dueDate"))
+
+
+@dataclass(frozen=True, slots=True)
+class TaskRecord:
+    id: str
+    title: str
+    status: Optional[str] = None
+    priority: Optional[str] = None
+    dueDate: Optional[str] = None  # pylint: disable=invalid-name
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Đọc field giống dict.get để tương thích với code đang dùng task.get(...)."""
+        if key not in _RECORD_FIELDS:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+
+@dataclass(frozen=True, slots=True)
+class TaskSummary:
+    """Tập id và số lượng theo status của từng danh sách task (active/today/future)."""
+
+    ids: Dict[str, FrozenSet[str]]
+    ordered_ids: Dict[str, Tuple[str, ...]]
+    status_counts: Dict[str, Dict[str, int]]
+
+    def count_status(self, list_name: str, status: str) -> int:
+        return self.status_counts.get(list_name, {}).get(status, 0)
+
+
+class TasksInfo(dict):
+    """dict của field "tasks" trong context, kèm TaskSummary đã tính sẵn."""
+
+    __slots__ = ("summary",)
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _to_record(item: Any, records: Dict[str, Any]) -> Any:
+    """Chuyển 1 task detail (dict) thành TaskRecord, dùng lại bản ghi đã có theo id."""
+    if not isinstance(item, dict) or not item.get("id") or not set(item) <= _RECORD_FIELDS:
+        # Dữ liệu lạ (thiếu id hoặc có field ngoài dự kiến): giữ nguyên dict
+        return item
+    task_id = item["id"]
+    record = records.get(task_id)
+    if record is None:
+        record = TaskRecord(
+            id=task_id,
+            title=item.get("title") or "",
+            status=_intern(item.get("status")),
+            priority=_intern(item.get("priority")),
+            dueDate=item.get("dueDate"),
+        )
+        records[task_id] = record
+    return record
+
+
+def _build_summary(tasks_info: Mapping[str, Any]) -> TaskSummary:
+    ids = {}
+    ordered_ids = {}
+    status_counts = {}
+    for list_name, _, details_key in _LIST_KEYS:
+        details = tasks_info.get(details_key) or []
+        ordered = tuple(item.get("id") for item in details if item.get("id"))
+        ids[list_name] = frozenset(ordered)
+        ordered_ids[list_name] = ordered
+        status_counts[list_name] = dict(Counter(item.get("status") for item in details))
+    return TaskSummary(ids=ids, ordered_ids=ordered_ids, status_counts=status_counts)
+
+
+def compact_tasks_info(tasks_info: Mapping[str, Any]) -> TasksInfo:
+    """Chuyển field "tasks" của context sang TaskRecord dùng chung và tính sẵn TaskSummary."""
+    records: Dict[str, Any] = {}
+    compact = TasksInfo(tasks_info)
+    for _, titles_key, details_key in _LIST_KEYS:
+        details = tasks_info.get(details_key)
+        if not isinstance(details, list):
+            continue
+        converted = [_to_record(item, records) for item in details]
+        compact[details_key] = converted
+
+        # Danh sách title tương ứng 1-1 với details: dùng chung chuỗi title của bản ghi
+        titles = tasks_info.get(titles_key)
+        if isinstance(titles, list) and len(titles) == len(converted):
+            compact[titles_key] = [
+                record.title if isinstance(record, TaskRecord) and record.title == title else title
+                for record, title in zip(converted, titles)
+            ]
+    compact.summary = _build_summary(compact)
+    return compact
+
+
+def compact_context(context: Any) -> Any:
+    """Trả về context với field "tasks" đã được compact (context khác dict thì giữ nguyên)."""
+    if not isinstance(context, dict) or not isinstance(context.get("tasks"), dict):
+        return context
+    compact = dict(context)
+    compact["tasks"] = compact_tasks_info(context["tasks"])
+    return compact
+
+
+def get_task_summary(context: Optional[Mapping[str, Any]]) -> TaskSummary:
+    """Lấy TaskSummary của context, tính lại nếu context chưa được compact (vd view theo nhánh)."""
+    tasks_info = (context or {}).get("tasks") or {}
+    summary = getattr(tasks_info, "summary", None)
+    if summary is None:
+        summary = _build_summary(tasks_info)
+    return summary
+
+
+def json_default(task: Any) -> Any:
+    """Hook default cho json.dumps: chuyển TaskRecord về dict (dùng khi serialize ngoài Flask)."""
+    if isinstance(task, TaskRecord):
+        return {field: getattr(task, field) for field in TaskRecord.__dataclass_fields__}
+    raise TypeError(f"Object of type {type(task).__name__} is not JSON serializable")
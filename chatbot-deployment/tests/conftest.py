@@ -0,0 +1,107 @@
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+# Các module của chatbot import nhau theo tên (from config import ...) và đọc
+# intents.json/data.pth theo đường dẫn tương đối, nên test chạy từ thư mục chatbot-deployment.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+
+class _StubServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Client bỏ đi khi timeout (test timeout/latency budget): không in traceback
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubBackend:
+    """
+    Backend Node giả lập chạy trên cổng local.
+
+    routes: {"GET /chatbot/context": handler}, handler(req) trả về (status, headers, body)
+    với body là object JSON (hoặc None nếu không có body). Route không khai báo trả 404.
+    Mọi request nhận được được ghi lại trong `requests`.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self):
+                parts = urlsplit(self.path)
+                path = parts.path[len("/api"):] if parts.path.startswith("/api") else parts.path
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                req = {
+                    "method": self.command,
+                    "path": path,
+                    "query": {key: values[0] for key, values in parse_qs(parts.query).items()},
+                    "headers": dict(self.headers),
+                    "json": json.loads(raw) if raw else None,
+                }
+                with stub._lock:
+                    stub.requests.append(req)
+                handler = stub.routes.get(f"{self.command} {path}")
+                status, headers, body = handler(req) if handler else (404, {}, {"success": False})
+
+                payload = json.dumps(body).encode("utf-8") if body is not None else b""
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = _handle
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+        self.server = _StubServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api"
+        self._thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+
+    def route(self, method, path, handler):
+        self.routes[f"{method} {path}"] = handler
+
+    def json_route(self, method, path, data, status=200):
+        """Route trả về {"data": data} như sendSuccess của backend."""
+        self.route(method, path, lambda req: (status, {}, {"success": True, "data": data}))
+
+    def calls(self, path):
+        with self._lock:
+            return [req for req in self.requests if req["path"] == path]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """Stub backend + trạng thái sạch cho cache context, cache tiến độ và circuit breaker."""
+    import progress_cache  # pylint: disable=import-outside-toplevel
+    import resilience  # pylint: disable=import-outside-toplevel
+    import utils  # pylint: disable=import-outside-toplevel
+
+    stub = StubBackend()
+    monkeypatch.setattr(utils, "BACKEND_API_URL", stub.url)
+    monkeypatch.setattr(resilience, "_breakers", {})
+    utils._context_cache.clear()  # pylint: disable=protected-access
+    progress_cache.progress_cache.clear()
+    yield stub
+    stub.close()
+    utils._context_cache.clear()  # pylint: disable=protected-access
+    progress_cache.progress_cache.clear()
@@ -0,0 +1,166 @@
+import threading
+import time
+
+import pytest
+
+import admission
+import app as app_module
+from admission import AdmissionRejected, ConcurrencyLimiter, TokenBucketLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_allows_burst_then_rejects(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    limiter = TokenBucketLimiter(rate=2, burst=3)
+
+    assert [limiter.try_acquire("a")[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = limiter.try_acquire("a")
+    assert not allowed
+    assert retry_after == pytest.approx(0.5)
+    # Key khác có bucket riêng
+    assert limiter.try_acquire("b") == (True, 0.0)
+
+    clock.now += 0.5
+    assert limiter.try_acquire("a") == (True, 0.0)
+    assert not limiter.try_acquire("a")[0]
+
+
+def test_token_bucket_forgets_least_recently_used_keys():
+    limiter = TokenBucketLimiter(rate=1, burst=1, max_keys=2)
+    limiter.try_acquire("a")
+    limiter.try_acquire("b")
+    limiter.try_acquire("c")
+
+    assert list(limiter._buckets) == ["b", "c"]  # pylint: disable=protected-access
+    assert limiter.try_acquire("a")[0]
+
+
+def test_concurrency_limiter_rejects_when_queue_is_full():
+    limiter = ConcurrencyLimiter(max_concurrent=1, queue_size=0, queue_timeout=1)
+    limiter.acquire()
+
+    started = time.monotonic()
+    with pytest.raises(AdmissionRejected) as excinfo:
+        limiter.acquire()
+    assert time.monotonic() - started < 0.1
+    assert excinfo.value.reason == "server busy"
+    assert excinfo.value.retry_after_header == "1"
+
+    limiter.release()
+    limiter.acquire()
+    assert limiter.stats() == {"in_flight": 1, "waiting": 0, "max_concurrent": 1, "rejected": 1}
+
+
+def test_concurrency_limiter_queue_times_out():
+    limiter = ConcurrencyLimiter(max_concurrent=1, queue_size=1, queue_timeout=0.05)
+    limiter.acquire()
+
+    with pytest.raises(AdmissionRejected):
+        limiter.acquire()
+    assert limiter.stats()["waiting"] == 0
+
+
+def test_queued_request_gets_slot_when_released():
+    limiter = ConcurrencyLimiter(max_concurrent=1, queue_size=1, queue_timeout=5)
+    limiter.acquire()
+    admitted = threading.Event()
+
+    def wait_for_slot():
+        limiter.acquire()
+        admitted.set()
+
+    thread = threading.Thread(target=wait_for_slot)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while limiter.stats()["waiting"] != 1:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+    # Hàng đợi đầy: request thứ 3 bị từ chối ngay
+    with pytest.raises(AdmissionRejected):
+        limiter.acquire()
+
+    limiter.release()
+    thread.join(5)
+    assert admitted.is_set()
+    assert limiter.stats()["in_flight"] == 1
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    """Rate limit 1 request/giây, burst 2; tối đa 2 request đồng thời, không có hàng đợi."""
+    rate_limiter = TokenBucketLimiter(rate=1, burst=2)
+    concurrency_limiter = ConcurrencyLimiter(max_concurrent=2, queue_size=0, queue_timeout=0.1)
+    monkeypatch.setattr(admission, "rate_limiter", rate_limiter)
+    monkeypatch.setattr(admission, "concurrency_limiter", concurrency_limiter)
+    return concurrency_limiter
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+def test_rate_limited_requests_get_429_with_retry_after(backend, limits, client):
+    statuses = [client.post("/predict", json={"message": "hello", "token": "tok"}).status_code for _ in range(2)]
+    response = client.post("/predict", json={"message": "hello", "token": "tok"})
+
+    assert statuses == [200, 200]
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert response.get_json() == {"error": "Too many requests", "reason": "rate limit exceeded"}
+    assert client.post("/predict", json={"message": "hello", "token": "other"}).status_code == 200
+
+
+def test_requests_without_token_share_no_rate_limit_bucket(limits, client):
+    statuses = {client.post("/predict", json={"message": "hello"}).status_code for _ in range(10)}
+    assert statuses == {200}
+
+
+def test_busy_worker_rejects_with_429(limits, client):
+    limits.acquire()
+    limits.acquire()
+    try:
+        response = client.post("/predict", json={"message": "hello"})
+    finally:
+        limits.release()
+        limits.release()
+
+    assert response.status_code == 429
+    assert response.get_json()["reason"] == "server busy"
+
+
+def test_stream_releases_slot_when_finished(limits, client):
+    response = client.post("/predict/stream", json={"message": "hello"})
+
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).endswith("event: done\ndata: {}\n\n")
+    assert limits.stats()["in_flight"] == 0
+
+
+def test_stream_releases_slot_when_setup_fails(limits, client, monkeypatch):
+    def broken_load_session(session_id):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(app_module, "load_session", broken_load_session)
+
+    response = client.post("/predict/stream", json={"message": "hello", "session_id": "s1"})
+
+    assert response.status_code == 500
+    assert limits.stats()["in_flight"] == 0
+
+
+def test_stream_releases_slot_when_closed_before_streaming(limits, client):
+    response = client.post("/predict/stream", json={"message": "hello"}, buffered=False)
+    assert limits.stats()["in_flight"] == 1
+
+    response.close()
+
+    assert limits.stats()["in_flight"] == 0
@@ -0,0 +1,101 @@
+import pytest
+
+import admission
+import app as app_module
+import chat
+from session_store import session_store
+from task_records import compact_context
+from utils import replace_placeholders
+
+CONTEXT_PATH = "/chatbot/context"
+
+
+def _context(active_titles):
+    details = [{"id": f"t{i}", "title": title, "status": "todo"} for i, title in enumerate(active_titles)]
+    return {
+        "user": {"name": "Nguyen An", "firstname": "An"},
+        "tasks": {
+            "activeTasks": list(active_titles),
+            "activeTasksCount": len(active_titles),
+            "todayTasks": list(active_titles),
+            "todayTasksCount": len(active_titles),
+            "futureTasksCount": 0,
+            "activeTaskDetails": details,
+            "todayTaskDetails": details,
+        },
+    }
+
+
+@pytest.fixture
+def client(backend, monkeypatch):
+    # Mọi test dùng chung 1 token: tắt rate limit theo user
+    monkeypatch.setattr(admission, "rate_limiter", None)
+    backend.json_route("GET", CONTEXT_PATH, _context(["Viết báo cáo"]))
+    yield app_module.app.test_client()
+    session_store.delete("s1")
+
+
+def _ask(client, message):
+    response = client.post("/predict", json={"message": message, "token": "tok", "session_id": "s1"})
+    assert response.status_code == 200
+    return response.get_json()["answer"]
+
+
+def test_follow_up_turns_reuse_session_snapshot(client, backend):
+    assert chat.classify("Hi") == "greeting"
+
+    _ask(client, "Hi")
+    _ask(client, "Hi")
+
+    assert len(backend.calls(CONTEXT_PATH)) == 1
+
+
+@pytest.mark.parametrize("message, tag", [
+    ("Tôi đã làm hết task rồi", "finishAllTask"),
+    ("Hôm nay có những task gì?", "todayTask"),
+    ("Tôi đã hoàn thành một phần các task được đề xuất rồi", "finishPartOfRecommentedTask"),
+])
+def test_completion_intents_do_not_use_session_snapshot(client, backend, message, tag):
+    assert chat.classify(message) == tag
+
+    _ask(client, "Hi")
+    _ask(client, message)
+
+    assert len(backend.calls(CONTEXT_PATH)) == 2
+
+
+def test_finished_tasks_are_seen_right_after_previous_turn(client, backend):
+    _ask(client, "Hi")
+    # User hoàn thành task trên UI ngay sau lượt trước
+    backend.json_route("GET", CONTEXT_PATH, _context([]))
+
+    answer = _ask(client, "Tôi đã làm hết task rồi")
+
+    fresh = compact_context(_context([]))
+    finished = chat._intents_by_tag["finishAllRecommentedTask"]["responses"]  # pylint: disable=protected-access
+    assert answer in {replace_placeholders(template, fresh) for template in finished}
+
+
+TEAM_MESSAGE = "Tiến độ của cả team hiện tại thế nào?"
+GROUP_PROGRESS_PATH = "/chatbot/group-progress"
+
+
+def test_team_progress_without_group_skips_progress_fetch(client, backend):
+    assert chat.classify(TEAM_MESSAGE) == "teamProgress"
+    backend.json_route("GET", GROUP_PROGRESS_PATH, {"groupId": "g", "totalTasks": 4})
+
+    answer = _ask(client, TEAM_MESSAGE)
+
+    ask_group = chat._intents_by_tag["AskGroupName"]["responses"]  # pylint: disable=protected-access
+    assert answer in {replace_placeholders(template, compact_context(_context(["Viết báo cáo"]))) for template in ask_group}
+    assert not backend.calls(GROUP_PROGRESS_PATH)
+
+
+def test_team_progress_with_group_fetches_progress(client, backend):
+    backend.json_route("GET", CONTEXT_PATH, dict(_context(["Viết báo cáo"]), group={"id": "g", "name": "G"}))
+    backend.json_route("GET", GROUP_PROGRESS_PATH, {"groupId": "g", "totalTasks": 4})
+
+    answer = _ask(client, TEAM_MESSAGE)
+
+    assert answer.endswith("(Tổng số task trong group: 4)")
+    assert len(backend.calls(GROUP_PROGRESS_PATH)) == 1
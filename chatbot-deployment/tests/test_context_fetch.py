@@ -0,0 +1,168 @@
+import requests
+
+import utils
+from task_records import TaskRecord
+
+CONTEXT_PATH = "/chatbot/context"
+
+
+def _context(version=1, today=("Viết báo cáo",)):
+    details = [{"id": f"t{i}", "title": title, "status": "todo"} for i, title in enumerate(today)]
+    return {
+        "user": {"name": "Nguyen An"},
+        "version": version,
+        "tasks": {
+            "todayTasks": list(today),
+            "todayTasksCount": len(today),
+            "todayTaskDetails": details,
+            "futureTasks": ["Họp nhóm"],
+            "futureTasksCount": 1,
+            "futureTaskDetails": [{"id": "f1", "title": "Họp nhóm", "status": "todo"}],
+        },
+    }
+
+
+def _conditional_route(backend, context, etag='"v1"', last_modified="Mon, 19 Oct 2026 08:00:00 GMT"):
+    """Route /chatbot/context trả 304 khi If-None-Match khớp ETag hiện tại."""
+
+    def handler(req):
+        if req["headers"].get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, None
+        return 200, {"ETag": etag, "Last-Modified": last_modified}, {"success": True, "data": context}
+
+    backend.route("GET", CONTEXT_PATH, handler)
+
+
+def test_first_fetch_is_unconditional(backend):
+    _conditional_route(backend, _context())
+
+    context = utils.get_user_context("token-a")
+
+    assert context["user"]["name"] == "Nguyen An"
+    assert isinstance(context["tasks"]["todayTaskDetails"][0], TaskRecord)
+    (req,) = backend.calls(CONTEXT_PATH)
+    assert req["headers"]["Authorization"] == "Bearer token-a"
+    assert "If-None-Match" not in req["headers"]
+    assert "If-Modified-Since" not in req["headers"]
+    assert "since" not in req["query"]
+
+
+def test_second_fetch_sends_validators_and_since(backend):
+    _conditional_route(backend, _context(version=7))
+
+    utils.get_user_context("token-a")
+    utils.get_user_context("token-a")
+
+    first, second = backend.calls(CONTEXT_PATH)
+    assert "If-None-Match" not in first["headers"]
+    assert second["headers"]["If-None-Match"] == '"v1"'
+    assert second["headers"]["If-Modified-Since"] == "Mon, 19 Oct 2026 08:00:00 GMT"
+    assert second["query"]["since"] == "7"
+
+
+def test_not_modified_returns_cached_context_without_parsing(backend, monkeypatch):
+    _conditional_route(backend, _context())
+    cached = utils.get_user_context("token-a")
+
+    parsed = []
+    original_json = requests.Response.json
+    monkeypatch.setattr(requests.Response, "json", lambda self, **kw: parsed.append(1) or original_json(self, **kw))
+    monkeypatch.setattr(utils, "compact_context", lambda context: parsed.append(2) or context)
+
+    context = utils.get_user_context("token-a")
+
+    assert context is cached
+    assert parsed == []
+    assert len(backend.calls(CONTEXT_PATH)) == 2
+
+
+def test_cache_is_per_token(backend):
+    _conditional_route(backend, _context())
+
+    utils.get_user_context("token-a")
+    utils.get_user_context("token-b")
+
+    _, second = backend.calls(CONTEXT_PATH)
+    assert second["headers"]["Authorization"] == "Bearer token-b"
+    assert "If-None-Match" not in second["headers"]
+
+
+def test_delta_response_is_merged_into_cached_context(backend):
+    full = _context(version=1, today=("Viết báo cáo",))
+    delta = {
+        "delta": True,
+        "version": 2,
+        "tasks": {
+            "todayTasks": ["Viết báo cáo", "Sửa bug"],
+            "todayTasksCount": 2,
+            "todayTaskDetails": [
+                {"id": "t0", "title": "Viết báo cáo", "status": "completed"},
+                {"id": "t1", "title": "Sửa bug", "status": "todo"},
+            ],
+        },
+    }
+    responses = iter([(200, {"ETag": '"v1"'}, {"data": full}), (200, {"ETag": '"v2"'}, {"data": delta})])
+    backend.route("GET", CONTEXT_PATH, lambda req: next(responses))
+
+    utils.get_user_context("token-a")
+    merged = utils.get_user_context("token-a")
+
+    assert backend.calls(CONTEXT_PATH)[1]["query"]["since"] == "1"
+    assert merged["version"] == 2
+    assert "delta" not in merged
+    assert merged["user"] == {"name": "Nguyen An"}
+    tasks = merged["tasks"]
+    assert tasks["todayTasks"] == ["Viết báo cáo", "Sửa bug"]
+    assert [task.status for task in tasks["todayTaskDetails"]] == ["completed", "todo"]
+    # Các field task không có trong delta giữ nguyên từ context đã cache
+    assert tasks["futureTasks"] == ["Họp nhóm"]
+    assert tasks.summary.ids["today"] == frozenset({"t0", "t1"})
+    assert tasks.summary.count_status("today", "completed") == 1
+
+
+def test_merge_context_delta_keeps_base_untouched():
+    base = {"user": {"name": "An"}, "tasks": {"todayTasks": ["a"], "futureTasks": ["b"]}}
+    delta = {"delta": True, "tasks": {"todayTasks": ["c"]}, "date": "2026-10-19"}
+
+    merged = utils._merge_context_delta(base, delta)  # pylint: disable=protected-access
+
+    assert merged == {"user": {"name": "An"}, "tasks": {"todayTasks": ["c"], "futureTasks": ["b"]}, "date": "2026-10-19"}
+    assert base["tasks"] == {"todayTasks": ["a"], "futureTasks": ["b"]}
+
+
+def test_context_cache_evicts_least_recently_used(backend, monkeypatch):
+    monkeypatch.setattr(utils, "CHATBOT_CONTEXT_CACHE_MAX_ENTRIES", 2)
+    _conditional_route(backend, _context())
+
+    utils.get_user_context("token-a")
+    utils.get_user_context("token-b")
+    utils.get_user_context("token-a")  # token-a thành mới dùng gần nhất
+    utils.get_user_context("token-c")  # token-b bị loại
+    utils.get_user_context("token-a")
+    utils.get_user_context("token-b")
+
+    conditional = [
+        req["headers"]["Authorization"][len("Bearer "):]
+        for req in backend.calls(CONTEXT_PATH)
+        if "If-None-Match" in req["headers"]
+    ]
+    assert conditional == ["token-a", "token-a"]
+    assert len(utils._context_cache) == 2  # pylint: disable=protected-access
+
+
+def test_responses_without_validators_are_not_cached(backend):
+    context = _context()
+    del context["version"]
+    backend.json_route("GET", CONTEXT_PATH, context)
+
+    utils.get_user_context("token-a")
+    utils.get_user_context("token-a")
+
+    assert all("If-None-Match" not in req["headers"] for req in backend.calls(CONTEXT_PATH))
+    assert not utils._context_cache  # pylint: disable=protected-access
+
+
+def test_backend_error_returns_none(backend):
+    backend.route("GET", CONTEXT_PATH, lambda req: (500, {}, {"success": False}))
+
+    assert utils.get_user_context("token-a") is None
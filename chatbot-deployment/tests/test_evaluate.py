@@ -0,0 +1,74 @@
+import io
+import json
+
+import pytest
+
+import evaluate
+
+CONTEXT = {
+    "user": {"name": "Nguyen An"},
+    "group": {"id": "g", "name": "G"},
+    "tasks": {"todayTasks": ["Viết báo cáo"], "todayTasksCount": 1, "futureTasksCount": 0},
+}
+
+# "asdf qwer" có độ tin cậy thấp (tính là dự đoán None), "Bye" được gắn nhãn sai
+MESSAGES = [
+    {"message": "Hi", "tag": "greeting"},
+    {"message": "Hôm nay có những task gì?", "tag": "todayTask"},
+    {"message": "Tôi đã làm hết task rồi", "tag": "finishAllTask"},
+    {"message": "asdf qwer", "tag": "greeting"},
+    {"message": "Bye", "tag": "thanks"},
+    {"message": "Tiến độ của cả team hiện tại thế nào?", "context": CONTEXT},
+]
+
+
+@pytest.fixture
+def messages_path(tmp_path):
+    path = tmp_path / "messages.jsonl"
+    path.write_text("".join(json.dumps(item, ensure_ascii=False) + "\n" for item in MESSAGES), encoding="utf-8")
+    return str(path)
+
+
+def test_report_accuracy_confusion_and_low_confidence(messages_path):
+    report = evaluate.evaluate(messages_path, batch_size=4, threshold=0.75)
+
+    assert report["messages"] == 6
+    assert report["labeled"] == 5
+    assert report["accuracy"] == pytest.approx(3 / 5)
+    assert report["low_confidence_rate"] == pytest.approx(1 / 6)
+    assert report["confusion"] == {
+        "greeting": {"greeting": 1, None: 1},
+        "todayTask": {"todayTask": 1},
+        "finishAllTask": {"finishAllTask": 1},
+        "thanks": {"goodbye": 1},
+    }
+
+
+def test_rules_replay_never_calls_backend(backend, messages_path):
+    output = io.StringIO()
+
+    report = evaluate.evaluate(messages_path, batch_size=4, default_context=CONTEXT, run_rules=True, output=output)
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [record["predicted"] for record in records] == [
+        "greeting", "todayTask", "finishAllTask", None, "goodbye", "teamProgress",
+    ]
+    assert all(record["answer"] for record in records)
+    assert report["rules_messages_per_second"]
+    assert backend.requests == []
+
+
+def test_cli_prints_json_report(messages_path, capsys):
+    evaluate.main([messages_path, "--batch-size", "2", "--json"])
+
+    report = json.loads(capsys.readouterr().out)
+    assert report["messages"] == 6
+    assert report["accuracy"] == pytest.approx(3 / 5)
+
+
+@pytest.mark.parametrize("batch_size", ["0", "-1"])
+def test_cli_rejects_batch_size_below_one(messages_path, batch_size, capsys):
+    with pytest.raises(SystemExit):
+        evaluate.main([messages_path, "--batch-size", batch_size])
+
+    assert "--batch-size" in capsys.readouterr().err
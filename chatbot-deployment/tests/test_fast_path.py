@@ -0,0 +1,42 @@
+import pytest
+
+import chat
+from nltk_utils import tokenize
+
+PATTERNS = [pattern for intent in chat.intents["intents"] for pattern in intent["patterns"]]
+
+
+def _variants(pattern):
+    words = pattern.split()
+    return [
+        pattern,
+        pattern.upper(),
+        pattern.lower(),
+        f"  {pattern}\t",
+        "   ".join(words),
+        f"{pattern} ?",
+    ]
+
+
+def test_fast_path_index_agrees_with_model():
+    assert chat.check_fast_path_parity() == []
+
+
+@pytest.mark.parametrize("pattern", PATTERNS)
+def test_classify_matches_model_for_pattern_variants(pattern):
+    for message in _variants(pattern):
+        assert chat.classify(message) == chat._classify_with_model(tokenize(message)), message  # pylint: disable=protected-access
+
+
+def test_unknown_messages_fall_back_to_model():
+    before = chat.fast_path_stats()["misses"]
+    for message in ("xyz qwerty", "hôm qua trời mưa to lắm", "Ôn tập môn toán"):
+        assert chat.classify(message) == chat._classify_with_model(tokenize(message))  # pylint: disable=protected-access
+    assert chat.fast_path_stats()["misses"] > before
+
+
+def test_patterns_hit_the_exact_index():
+    before = chat.fast_path_stats()["exact_hits"]
+    for pattern in PATTERNS:
+        chat.classify(pattern)
+    assert chat.fast_path_stats()["exact_hits"] - before == len(PATTERNS)
@@ -0,0 +1,202 @@
+"""
+Golden test: khóa lại câu trả lời của chatbot cho mọi pattern trong intents.json và mọi tag,
+có/không có token và context, với backend giả lập (tests/conftest.py: StubBackend).
+
+tests/golden/responses.json được sinh từ chat.py trước khi tách thành handler registry,
+nên test này đảm bảo refactor không đổi hành vi. Khi cố ý đổi câu trả lời, sinh lại bằng:
+
+    python tests/test_golden_responses.py --update
+"""
+import copy
+import datetime
+import json
+import os
+import random
+import sys
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden", "responses.json")
+GOLDEN_SEED = 7
+# Ngày cố định để câu trả lời không phụ thuộc ngày chạy test (không phải ngày đặc biệt)
+GOLDEN_DATE = datetime.date(2026, 10, 19)
+
+_PROGRESS = {"totalTasks": 4, "todo": {"count": 1, "percent": 25}, "completed": {"count": 3, "percent": 75}}
+
+# Dữ liệu backend: path -> data (GET trả {"data": ...}), thiếu path thì backend trả 404
+BACKEND_STATES = [
+    {},
+    {
+        "/chatbot/recommended-tasks/evaluate": {"hasRecommended": True, "allCompleted": False, "anyCompleted": True},
+        "/chatbot/group-progress": dict(_PROGRESS, groupId="g"),
+        "/chatbot/member-progress": dict(_PROGRESS, groupId="g"),
+    },
+    {"/chatbot/recommended-tasks/evaluate": {"hasRecommended": True, "allCompleted": True}},
+]
+
+CONTEXTS = [
+    None,
+    {
+        "user": {"name": "Nguyen An", "firstname": "An"},
+        "group": {"id": "g", "name": "G"},
+        "member": {"id": "m", "name": "Binh"},
+        "tasks": {
+            "activeTasks": ["a", "b"],
+            "activeTasksCount": 2,
+            "todayTasks": ["a"],
+            "todayTasksCount": 1,
+            "futureTasks": ["b"],
+            "futureTasksCount": 1,
+            "activeTaskDetails": [{"id": "1", "title": "a"}, {"id": "2", "title": "b"}],
+            "todayTaskDetails": [{"id": "1", "title": "a"}],
+            "futureTaskDetails": [{"id": "2", "title": "b", "status": "todo"}],
+        },
+    },
+    {
+        "user": {"name": "An"},
+        "tasks": {
+            "activeTasks": ["b"],
+            "activeTasksCount": 1,
+            "todayTasks": [],
+            "todayTasksCount": 0,
+            "futureTasks": ["b"],
+            "futureTasksCount": 1,
+            "futureTaskDetails": [{"id": "2", "title": "b", "status": "completed"}],
+        },
+    },
+    {"user": {"name": "An"}, "tasks": {"activeTasksCount": 0, "todayTasksCount": 0, "futureTasksCount": 0}},
+]
+
+EXTRA_MESSAGES = ["asdf qwer", "???", "  HELLO  ", "Hôm nay có TASK gì?"]
+
+
+class _FixedDate(datetime.date):
+    @classmethod
+    def today(cls):
+        return GOLDEN_DATE
+
+
+def _combinations():
+    """(tên case, index backend state, index context, token); không có token thì backend không được gọi."""
+    for state_index in range(len(BACKEND_STATES)):
+        for context_index in range(len(CONTEXTS)):
+            for token in (None, "tok"):
+                if token is None and state_index:
+                    continue
+                yield f"state{state_index}/context{context_index}/{token or 'no-token'}", state_index, context_index, token
+
+
+def _use_backend_state(backend, state_index):
+    backend.routes.clear()
+    for path, data in BACKEND_STATES[state_index].items():
+        backend.json_route("GET", path, data)
+    backend.json_route("POST", "/chatbot/recommended-tasks", {})
+
+
+def _reset_caches():
+    import progress_cache  # pylint: disable=import-outside-toplevel
+
+    progress_cache.progress_cache.clear()
+
+
+def collect_answers(backend, respond_to_message, respond_to_tag, tags, messages):
+    """
+    Chạy mọi case, trả về {case: {"messages": {msg: answer}, "tags": {tag: [answer, session]}}}.
+    respond_to_message(msg, context, token) -> str
+    respond_to_tag(tag, context, token, session) -> str (tag None = độ tin cậy thấp)
+    """
+    results = {}
+    for name, state_index, context_index, token in _combinations():
+        _use_backend_state(backend, state_index)
+        context = CONTEXTS[context_index]
+        case = {"messages": {}, "tags": {}}
+        for message in messages:
+            _reset_caches()
+            random.seed(GOLDEN_SEED)
+            case["messages"][message] = respond_to_message(message, copy.deepcopy(context), token)
+        for tag in list(tags) + [None]:
+            _reset_caches()
+            random.seed(GOLDEN_SEED)
+            session = {}
+            answer = respond_to_tag(tag, copy.deepcopy(context), token, session)
+            case["tags"][str(tag)] = [answer, session]
+        results[name] = case
+    return results
+
+
+def _messages(chat_module):
+    patterns = [pattern for intent in chat_module.intents["intents"] for pattern in intent["patterns"]]
+    return list(dict.fromkeys(patterns + EXTRA_MESSAGES))
+
+
+def _current_answers(backend):
+    import chat  # pylint: disable=import-outside-toplevel
+
+    return collect_answers(
+        backend,
+        lambda msg, context, token: chat.get_response(msg, context=context, token=token),
+        lambda tag, context, token, session: "\n\n".join(
+            chat.iter_response_for_tag(tag, context=context, token=token, session=session)
+        ),
+        chat.tags,
+        _messages(chat),
+    )
+
+
+def _diff(expected, actual, limit=10):
+    diffs = []
+    for name, case in expected.items():
+        for kind in ("messages", "tags"):
+            for key, value in case[kind].items():
+                got = actual.get(name, {}).get(kind, {}).get(key)
+                if got != value:
+                    diffs.append(f"{name} {kind}[{key!r}]\n  expected {value!r}\n  got      {got!r}")
+    return diffs[:limit], len(diffs)
+
+
+def test_answers_match_golden(backend, monkeypatch):
+    import utils  # pylint: disable=import-outside-toplevel
+
+    monkeypatch.setattr(utils, "date", _FixedDate)
+    with open(GOLDEN_PATH, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+
+    actual = _current_answers(backend)
+
+    assert set(actual) == set(expected)
+    diffs, total = _diff(expected, actual)
+    assert not total, f"{total} answers differ from golden:\n" + "\n".join(diffs)
+
+
+def test_golden_covers_every_pattern_and_tag():
+    import chat  # pylint: disable=import-outside-toplevel
+
+    with open(GOLDEN_PATH, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+
+    for case in expected.values():
+        assert set(case["messages"]) == set(_messages(chat))
+        assert set(case["tags"]) == {str(tag) for tag in chat.tags} | {"None"}
+
+
+def _update():
+    import conftest  # pylint: disable=import-outside-toplevel
+    import utils  # pylint: disable=import-outside-toplevel
+
+    backend = conftest.StubBackend()
+    utils.BACKEND_API_URL = backend.url
+    utils.date = _FixedDate
+    try:
+        answers = _current_answers(backend)
+    finally:
+        backend.close()
+
+    os.makedirs(os.path.dirname(GOLDEN_PATH), exist_ok=True)
+    with open(GOLDEN_PATH, "w", encoding="utf-8") as f:
+        json.dump(answers, f, ensure_ascii=False, indent=1, sort_keys=True)
+        f.write("\n")
+    print(f"wrote {GOLDEN_PATH}")
+
+
+if __name__ == "__main__":
+    if "--update" not in sys.argv:
+        sys.exit("usage: python tests/test_golden_responses.py --update")
+    _update()
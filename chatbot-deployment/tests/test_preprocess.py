@@ -0,0 +1,88 @@
+import json
+
+import numpy as np
+import pytest
+
+from nltk_utils import bag_of_words, stem, tokenize
+from preprocess import IGNORE_WORDS, load_corpus
+
+INTENTS_PATH = "intents.json"
+
+
+def _inline_corpus(intents_path):
+    """Tiền xử lý như train.py trước khi có cache: tokenize/stem lại mọi pattern."""
+    with open(intents_path, "r", encoding="utf-8") as f:
+        intents = json.load(f)
+    all_words, tags, xy = [], [], []
+    for intent in intents["intents"]:
+        tags.append(intent["tag"])
+        for pattern in intent["patterns"]:
+            words = tokenize(pattern)
+            all_words.extend(words)
+            xy.append((words, intent["tag"]))
+    all_words = sorted(set(stem(w) for w in all_words if w not in IGNORE_WORDS))
+    tags = sorted(set(tags))
+    X_train = np.array([bag_of_words(words, all_words) for words, _ in xy])
+    y_train = np.array([tags.index(tag) for _, tag in xy])
+    return {"all_words": all_words, "tags": tags, "xy": xy, "X_train": X_train, "y_train": y_train}
+
+
+def _assert_same_corpus(actual, expected):
+    assert actual["all_words"] == expected["all_words"]
+    assert actual["tags"] == expected["tags"]
+    assert actual["xy"] == expected["xy"]
+    np.testing.assert_array_equal(actual["X_train"], expected["X_train"])
+    np.testing.assert_array_equal(actual["y_train"], expected["y_train"])
+
+
+@pytest.fixture(scope="module")
+def inline_corpus():
+    return _inline_corpus(INTENTS_PATH)
+
+
+def test_cold_build_matches_inline_preprocessing(tmp_path, inline_corpus):
+    corpus = load_corpus(INTENTS_PATH, str(tmp_path))
+
+    assert not corpus["cache_hit"]
+    assert corpus["fresh_patterns"] == len(inline_corpus["xy"])
+    _assert_same_corpus(corpus, inline_corpus)
+
+
+def test_warm_load_comes_from_cache(tmp_path, inline_corpus):
+    load_corpus(INTENTS_PATH, str(tmp_path))
+
+    corpus = load_corpus(INTENTS_PATH, str(tmp_path))
+
+    assert corpus["cache_hit"]
+    assert corpus["fresh_patterns"] == 0
+    _assert_same_corpus(corpus, inline_corpus)
+
+
+def test_edited_pattern_is_the_only_one_reprocessed(tmp_path):
+    intents_path = tmp_path / "intents.json"
+    intents = {"intents": [
+        {"tag": "greeting", "patterns": ["Hi", "Hello there", "Good morning"]},
+        {"tag": "goodbye", "patterns": ["Bye", "See you later"]},
+    ]}
+    intents_path.write_text(json.dumps(intents), encoding="utf-8")
+    cache_dir = str(tmp_path / "cache")
+    load_corpus(str(intents_path), cache_dir)
+
+    intents["intents"][1]["patterns"][1] = "See you tomorrow"
+    intents_path.write_text(json.dumps(intents), encoding="utf-8")
+    corpus = load_corpus(str(intents_path), cache_dir)
+
+    assert not corpus["cache_hit"]
+    assert corpus["fresh_patterns"] == 1
+    _assert_same_corpus(corpus, _inline_corpus(str(intents_path)))
+
+
+def test_unwritable_cache_dir_still_builds(tmp_path, inline_corpus):
+    # Một file thường ở vị trí thư mục cache: không tạo thư mục/ghi file cache được
+    cache_dir = tmp_path / "not-a-dir"
+    cache_dir.write_text("", encoding="utf-8")
+
+    corpus = load_corpus(INTENTS_PATH, str(cache_dir))
+
+    assert not corpus["cache_hit"]
+    _assert_same_corpus(corpus, inline_corpus)
@@ -0,0 +1,102 @@
+import math
+import time
+
+import pytest
+from flask import Flask
+
+import app as app_module
+import profiling
+from profiling import MAX_SAMPLE_DURATION, MIN_SAMPLE_INTERVAL, sample_stacks
+
+ADMIN_TOKEN = "admin-secret"
+ADMIN = {"X-Admin-Token": ADMIN_TOKEN}
+
+
+@pytest.mark.parametrize("duration, interval", [
+    (math.nan, 0.005),
+    (-1.0, 0.005),
+    (0.0, math.nan),
+    (0.0, math.inf),
+])
+def test_sample_stacks_clamps_non_finite_and_negative_values(duration, interval):
+    started = time.monotonic()
+    result = sample_stacks(duration, interval)
+
+    assert time.monotonic() - started < 1
+    assert result["samples"] == 1
+    assert MIN_SAMPLE_INTERVAL <= result["interval"] <= MAX_SAMPLE_DURATION
+
+
+def test_sample_stacks_skips_sampling_thread():
+    result = sample_stacks(0.02, 0.005)
+
+    assert result["samples"] >= 2
+    assert "MainThread" not in result["collapsed"]
+
+
+@pytest.fixture
+def profiling_client(monkeypatch):
+    """App riêng có đăng ký route profiling, như khi CHATBOT_PROFILING_ENABLED bật."""
+    monkeypatch.setattr(app_module, "CHATBOT_ADMIN_TOKEN", ADMIN_TOKEN)
+    flask_app = Flask(__name__)
+    app_module._register_profiling(flask_app)  # pylint: disable=protected-access
+    return flask_app.test_client()
+
+
+def test_profiling_routes_absent_when_disabled():
+    assert not app_module.CHATBOT_PROFILING_ENABLED
+    client = app_module.app.test_client()
+
+    assert client.get("/admin/profile/sample?seconds=0", headers=ADMIN).status_code == 404
+    assert client.get("/admin/profile/requests", headers=ADMIN).status_code == 404
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Admin-Token": "wrong"}])
+def test_profiling_requires_admin_token(profiling_client, headers):
+    assert profiling_client.get("/admin/profile/sample?seconds=0", headers=headers).status_code == 404
+    assert profiling_client.get("/admin/profile/requests", headers=headers).status_code == 404
+
+
+def test_sample_endpoint_returns_collapsed_stacks(profiling_client):
+    response = profiling_client.get("/admin/profile/sample?seconds=0.01&interval=0.005&format=json", headers=ADMIN)
+
+    assert response.status_code == 200
+    assert response.get_json()["samples"] >= 1
+
+
+def test_sample_endpoint_rejects_concurrent_session(profiling_client):
+    assert profiling._sampling_lock.acquire(blocking=False)  # pylint: disable=protected-access
+    try:
+        response = profiling_client.get("/admin/profile/sample?seconds=0", headers=ADMIN)
+    finally:
+        profiling._sampling_lock.release()  # pylint: disable=protected-access
+
+    assert response.status_code == 409
+
+
+@pytest.mark.parametrize("query", [
+    "seconds=nan",
+    "seconds=inf",
+    "seconds=-inf",
+    "seconds=abc",
+    "interval=nan",
+    "interval=inf",
+    "seconds=0&interval=",
+])
+def test_sample_endpoint_rejects_bad_parameters(profiling_client, query):
+    response = profiling_client.get(f"/admin/profile/sample?{query}", headers=ADMIN)
+
+    assert response.status_code == 400
+
+
+def test_request_profile_is_listed_and_readable(profiling_client):
+    response = profiling_client.get("/admin/profile/requests", headers=dict(ADMIN, **{"X-Profile": "1"}))
+    profile_id = response.headers["X-Profile-Id"]
+    response.close()
+
+    listed = profiling_client.get("/admin/profile/requests", headers=ADMIN).get_json()["profiles"]
+    assert profile_id in [profile["id"] for profile in listed]
+    stats = profiling_client.get(f"/admin/profile/requests/{profile_id}", headers=ADMIN)
+    assert stats.status_code == 200
+    assert "function calls" in stats.get_data(as_text=True)
+    assert profiling_client.get("/admin/profile/requests/missing", headers=ADMIN).status_code == 404
@@ -0,0 +1,240 @@
+import threading
+import time
+
+import pytest
+
+import progress_cache
+import resilience
+from progress_cache import ProgressCache
+
+
+def _progress(group_id, total=4):
+    return {"groupId": group_id, "totalTasks": total, "completed": {"count": 1, "percent": 25}}
+
+
+class StubFetch:
+    """fetch() giả lập cho 1 token, đếm số lần gọi và có thể chặn cho tới khi được thả."""
+
+    def __init__(self, result, gate=None):
+        self.result = result
+        self.gate = gate
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+        if self.gate is not None:
+            assert self.gate.wait(5)
+        return self.result
+
+
+@pytest.fixture
+def cache():
+    return ProgressCache(ttl_seconds=30, auth_ttl_seconds=300, max_entries=100)
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_authorized_tokens_share_cached_data(cache):
+    fetch_a = StubFetch(_progress("G"))
+    fetch_b = StubFetch(_progress("G", total=5))
+
+    assert cache.get_or_fetch("group", "G", "", "token-a", fetch_a) == _progress("G")
+    # B chưa từng được backend xác nhận quyền: phải tự gọi backend
+    assert cache.get_or_fetch("group", "G", "", "token-b", fetch_b) == _progress("G", total=5)
+    # Sau đó cả 2 dùng chung dữ liệu cache mới nhất, không gọi backend nữa
+    assert cache.get_or_fetch("group", "G", "", "token-a", fetch_a) == _progress("G", total=5)
+    assert cache.get_or_fetch("group", "G", "", "token-b", fetch_b) == _progress("G", total=5)
+
+    assert (fetch_a.calls, fetch_b.calls) == (1, 1)
+    assert cache.stats()["hits"] == 2
+
+
+def test_unauthorized_token_never_reads_cached_data(cache):
+    cache.get_or_fetch("group", "G", "", "token-a", StubFetch(_progress("G")))
+    refused = StubFetch(None)
+
+    for _ in range(3):
+        assert cache.get_or_fetch("group", "G", "", "token-c", refused) is None
+
+    assert refused.calls == 3
+
+
+def test_refusal_revokes_remembered_authorization(cache):
+    cache.get_or_fetch("group", "G", "", "token-a", StubFetch(_progress("G")))
+    cache.get_or_fetch("group", "G", "", "token-b", StubFetch(_progress("G")))
+
+    # B mất quyền (bị đổi role): lần refresh tiếp theo backend từ chối
+    cache.invalidate_group("G")
+    assert cache.get_or_fetch("group", "G", "", "token-b", StubFetch(None)) is None
+    cache.get_or_fetch("group", "G", "", "token-a", StubFetch(_progress("G")))
+
+    refused = StubFetch(None)
+    assert cache.get_or_fetch("group", "G", "", "token-b", refused) is None
+    assert refused.calls == 1
+
+
+def test_stale_context_group_is_not_cached_under_old_group(cache):
+    cache.get_or_fetch("group", "G", "", "token-b", StubFetch(_progress("G")))
+    cache.invalidate_group("G")
+
+    # Context của A còn ghi group G nhưng backend đã chuyển A sang group H
+    moved = StubFetch(_progress("H"))
+    assert cache.get_or_fetch("group", "G", "", "token-a", moved) == _progress("H")
+
+    fetch_b = StubFetch(_progress("G"))
+    assert cache.get_or_fetch("group", "G", "", "token-b", fetch_b) == _progress("G")
+    assert fetch_b.calls == 1
+    # A không được ghi nhận quyền với G
+    moved_again = StubFetch(_progress("H"))
+    cache.get_or_fetch("group", "G", "", "token-a", moved_again)
+    assert moved_again.calls == 1
+
+
+def test_member_data_is_keyed_by_group_and_member(cache):
+    cache.get_or_fetch("member", "G", "m1", "token-a", StubFetch(_progress("G", total=1)))
+    fetch_m2 = StubFetch(_progress("G", total=2))
+
+    assert cache.get_or_fetch("member", "G", "m2", "token-a", fetch_m2) == _progress("G", total=2)
+    assert fetch_m2.calls == 1
+    assert cache.invalidate_group("G") == 2
+
+
+def test_authorization_does_not_outlive_cached_data(monkeypatch, cache):
+    clock = [1000.0]
+    monkeypatch.setattr(progress_cache.time, "monotonic", lambda: clock[0])
+    assert cache.auth_ttl_seconds == cache.ttl_seconds
+    cache.get_or_fetch("group", "G", "", "token-a", StubFetch(_progress("G")))
+    cache.get_or_fetch("group", "G", "", "token-b", StubFetch(_progress("G")))
+
+    # Dữ liệu hết hạn và được A refresh; B đã bị hạ quyền nên backend từ chối B
+    clock[0] += cache.ttl_seconds + 1
+    cache.get_or_fetch("group", "G", "", "token-a", StubFetch(_progress("G", total=5)))
+    refused = StubFetch(None)
+
+    assert cache.get_or_fetch("group", "G", "", "token-b", refused) is None
+    assert refused.calls == 1
+
+
+def _run_concurrently(calls):
+    results = [None] * len(calls)
+
+    def run(index, call):
+        results[index] = call()
+
+    threads = [threading.Thread(target=run, args=(i, call)) for i, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def _authorize(cache, *tokens, group_id="G"):
+    for token in tokens:
+        cache.get_or_fetch("group", group_id, "", token, StubFetch(_progress(group_id)))
+    cache.invalidate_group(group_id)
+
+
+def test_concurrent_refreshes_are_coalesced(cache):
+    tokens = [f"token-{i}" for i in range(8)]
+    _authorize(cache, *tokens)
+    gate = threading.Event()
+    fetches = [StubFetch(_progress("G", total=9), gate) for _ in tokens]
+
+    threads, results = _run_concurrently([
+        lambda token=token, fetch=fetch: cache.get_or_fetch("group", "G", "", token, fetch)
+        for token, fetch in zip(tokens, fetches)
+    ])
+    _wait_for(lambda: cache.stats()["coalesced"] == len(tokens) - 1)
+    gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert sum(fetch.calls for fetch in fetches) == 1
+    assert results == [_progress("G", total=9)] * len(tokens)
+
+
+def test_coalesced_followers_never_receive_another_groups_data(cache):
+    _authorize(cache, "token-a", "token-b")
+    gate = threading.Event()
+    # A dẫn đầu refresh nhưng group của A trên backend đã đổi sang H
+    fetch_a = StubFetch(_progress("H"), gate)
+    fetch_b = StubFetch(_progress("G"))
+
+    threads_a, results_a = _run_concurrently([lambda: cache.get_or_fetch("group", "G", "", "token-a", fetch_a)])
+    _wait_for(lambda: fetch_a.calls == 1)
+    threads_b, results_b = _run_concurrently([lambda: cache.get_or_fetch("group", "G", "", "token-b", fetch_b)])
+    _wait_for(lambda: cache.stats()["coalesced"] == 1)
+    gate.set()
+    for thread in threads_a + threads_b:
+        thread.join()
+
+    assert results_a == [_progress("H")]
+    assert results_b == [_progress("G")]
+    assert fetch_b.calls == 1
+
+
+def test_followers_fetch_themselves_when_leader_is_refused(cache):
+    _authorize(cache, "token-a", "token-b")
+    gate = threading.Event()
+    fetch_a = StubFetch(None, gate)
+    fetch_b = StubFetch(_progress("G"))
+
+    threads_a, results_a = _run_concurrently([lambda: cache.get_or_fetch("group", "G", "", "token-a", fetch_a)])
+    _wait_for(lambda: fetch_a.calls == 1)
+    threads_b, results_b = _run_concurrently([lambda: cache.get_or_fetch("group", "G", "", "token-b", fetch_b)])
+    _wait_for(lambda: cache.stats()["coalesced"] == 1)
+    gate.set()
+    for thread in threads_a + threads_b:
+        thread.join()
+
+    assert results_a == [None]
+    assert results_b == [_progress("G")]
+
+
+def test_group_progress_through_stub_backend(backend):
+    groups = {"Bearer token-a": "G", "Bearer token-b": "G", "Bearer token-c": "H"}
+    backend.route(
+        "GET",
+        "/chatbot/group-progress",
+        lambda req: (200, {}, {"data": _progress(groups[req["headers"]["Authorization"]])}),
+    )
+    context_g = {"group": {"id": "G"}}
+
+    assert progress_cache.get_cached_group_progress("token-a", context_g)["groupId"] == "G"
+    assert progress_cache.get_cached_group_progress("token-b", context_g)["groupId"] == "G"
+    assert progress_cache.get_cached_group_progress("token-b", context_g)["groupId"] == "G"
+    # token-c có context cũ ghi group G nhưng thực tế thuộc group H
+    assert progress_cache.get_cached_group_progress("token-c", context_g)["groupId"] == "H"
+    assert progress_cache.get_cached_group_progress("token-a", context_g)["groupId"] == "G"
+
+    authorizations = [req["headers"]["Authorization"] for req in backend.calls("/chatbot/group-progress")]
+    assert authorizations == ["Bearer token-a", "Bearer token-b", "Bearer token-c"]
+
+
+def test_follower_wait_is_capped_by_latency_budget(cache):
+    _authorize(cache, "token-a", "token-b")
+    gate = threading.Event()
+    fetch_a = StubFetch(_progress("G"), gate)
+    fetch_b = StubFetch(_progress("G"))
+    threads_a, _ = _run_concurrently([lambda: cache.get_or_fetch("group", "G", "", "token-a", fetch_a)])
+    _wait_for(lambda: fetch_a.calls == 1)
+
+    resilience.start_latency_budget(0.1)
+    try:
+        started = time.monotonic()
+        assert cache.get_or_fetch("group", "G", "", "token-b", fetch_b) is None
+        elapsed = time.monotonic() - started
+    finally:
+        resilience.clear_latency_budget()
+        gate.set()
+        for thread in threads_a:
+            thread.join()
+
+    assert elapsed < 1
+    assert fetch_b.calls == 0
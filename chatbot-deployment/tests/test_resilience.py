@@ -0,0 +1,131 @@
+import random
+import time
+
+import pytest
+import requests
+
+import app as app_module
+import resilience
+import utils
+from resilience import CircuitBreaker, get_breaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(resilience.time, "monotonic", fake)
+    return fake
+
+
+@pytest.fixture
+def budget():
+    yield resilience.start_latency_budget
+    resilience.clear_latency_budget()
+
+
+def test_breaker_opens_then_recovers_through_half_open(clock):
+    breaker = CircuitBreaker("context", failure_threshold=2, recovery_timeout=10)
+
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.snapshot()["state"] == "closed"
+    breaker.record_failure()
+    assert breaker.snapshot()["state"] == "open"
+    assert not breaker.allow_request()
+
+    clock.now += 10
+    assert breaker.allow_request()
+    assert breaker.snapshot()["state"] == "half_open"
+    breaker.record_success()
+    assert breaker.snapshot() == {"state": "closed", "consecutive_failures": 0, "rejected": 1}
+
+
+def test_failed_trial_reopens_breaker(clock):
+    breaker = CircuitBreaker("context", failure_threshold=2, recovery_timeout=10)
+    breaker.record_failure()
+    breaker.record_failure()
+
+    clock.now += 10
+    assert breaker.allow_request()
+    breaker.record_failure()
+
+    assert breaker.snapshot()["state"] == "open"
+    clock.now += 9
+    assert not breaker.allow_request()
+
+
+def test_half_open_allows_a_single_trial(clock):
+    breaker = CircuitBreaker("context", failure_threshold=1, recovery_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+
+    assert [breaker.allow_request() for _ in range(3)] == [True, False, False]
+    breaker.release_trial()
+    assert breaker.allow_request()
+
+
+def test_backend_call_skipped_when_budget_is_spent(backend, budget):
+    backend.json_route("GET", "/chatbot/context", {"user": {"name": "An"}})
+    budget(0.01)
+
+    assert utils.get_user_context("tok") is None
+    assert not backend.calls("/chatbot/context")
+
+
+def _slow_route(seconds):
+    def handler(req):
+        time.sleep(seconds)
+        return 200, {}, {"success": True, "data": {}}
+
+    return handler
+
+
+def test_timeout_cut_short_by_budget_is_not_a_breaker_failure(backend, budget):
+    backend.route("GET", "/chatbot/slow", _slow_route(0.5))
+    budget(0.2)
+
+    with pytest.raises(requests.Timeout):
+        utils._backend_request("slow", "GET", backend.url + "/chatbot/slow")  # pylint: disable=protected-access
+
+    assert get_breaker("slow").snapshot()["consecutive_failures"] == 0
+
+
+def test_timeout_at_backend_timeout_is_a_breaker_failure(backend, monkeypatch):
+    monkeypatch.setattr(resilience, "CHATBOT_BACKEND_TIMEOUT", 0.1)
+    monkeypatch.setattr(utils, "CHATBOT_BACKEND_TIMEOUT", 0.1)
+    backend.route("GET", "/chatbot/slow", _slow_route(0.5))
+
+    with pytest.raises(requests.Timeout):
+        utils._backend_request("slow", "GET", backend.url + "/chatbot/slow")  # pylint: disable=protected-access
+
+    assert get_breaker("slow").snapshot()["consecutive_failures"] == 1
+
+
+def test_predict_degrades_to_no_context_answer_when_breaker_is_open(backend):
+    backend.json_route("GET", "/chatbot/context", {
+        "user": {"name": "Nguyen An"},
+        "tasks": {"todayTasks": ["Viết báo cáo"], "todayTasksCount": 1},
+    })
+    breaker = get_breaker("context")
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    client = app_module.app.test_client()
+    message = "Hôm nay có những task gì?"
+
+    random.seed(3)
+    degraded = client.post("/predict", json={"message": message, "token": "tok"})
+    random.seed(3)
+    anonymous = client.post("/predict", json={"message": message})
+
+    assert degraded.status_code == 200
+    assert degraded.get_json()["answer"] == anonymous.get_json()["answer"]
+    assert "Viết báo cáo" not in degraded.get_json()["answer"]
+    assert not backend.calls("/chatbot/context")
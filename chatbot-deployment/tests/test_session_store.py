@@ -0,0 +1,153 @@
+import sys
+import time
+
+import pytest
+
+import session_store
+from session_store import (
+    InMemorySessionStore,
+    RedisSessionStore,
+    get_cached_context,
+    hash_token,
+    load_session,
+    remember_context,
+    save_session,
+)
+
+
+class FakeRedis:
+    """Client giả lập Redis chỉ với get/setex/delete, TTL theo đồng hồ giả."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.values = {}
+
+    def get(self, key):
+        entry = self.values.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self.clock.now:
+            del self.values[key]
+            return None
+        return value.encode("utf-8")
+
+    def setex(self, key, ttl, value):
+        self.values[key] = (self.clock.now + ttl, value)
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(session_store.time, "monotonic", fake)
+    return fake
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request, clock):
+    if request.param == "memory":
+        return InMemorySessionStore(ttl_seconds=60, max_entries=100)
+    return RedisSessionStore(FakeRedis(clock), ttl_seconds=60)
+
+
+def test_store_roundtrip_and_delete(store):
+    assert store.get("s1") is None
+    store.set("s1", {"last_tag": "greeting", "turns": 1})
+    assert store.get("s1") == {"last_tag": "greeting", "turns": 1}
+    store.delete("s1")
+    assert store.get("s1") is None
+
+
+def test_store_entries_expire_after_ttl(store, clock):
+    store.set("s1", {"turns": 1})
+    clock.now += 59
+    assert store.get("s1") == {"turns": 1}
+    clock.now += 2
+    assert store.get("s1") is None
+
+
+def test_memory_store_returns_copies(clock):
+    store = InMemorySessionStore(ttl_seconds=60, max_entries=10)
+    state = {"turns": 1}
+    store.set("s1", state)
+    state["turns"] = 2
+    loaded = store.get("s1")
+    loaded["turns"] = 3
+    assert store.get("s1") == {"turns": 1}
+
+
+def test_memory_store_evicts_least_recently_used(clock):
+    store = InMemorySessionStore(ttl_seconds=60, max_entries=2)
+    store.set("a", {"n": 1})
+    store.set("b", {"n": 2})
+    assert store.get("a") == {"n": 1}  # "a" thành mới dùng gần nhất
+    store.set("c", {"n": 3})
+
+    assert store.get("b") is None
+    assert store.get("a") == {"n": 1}
+    assert store.get("c") == {"n": 3}
+    assert store.stats()["evictions"] == 1
+
+
+def test_cached_context_is_bound_to_token():
+    state = {}
+    context = {"user": {"name": "An"}}
+    remember_context(state, "token-a", context)
+
+    assert state["token_hash"] == hash_token("token-a")
+    assert "token-a" not in state.values()
+    assert get_cached_context(state, "token-a", max_age=15) is context
+    assert get_cached_context(state, "token-b", max_age=15) is None
+    assert get_cached_context(state, None, max_age=15) is None
+    assert get_cached_context(state, "token-a", max_age=0) is None
+
+
+def test_cached_context_expires_after_max_age(monkeypatch):
+    state = {}
+    remember_context(state, "token-a", {"user": {}})
+    later = state["context_fetched_at"] + 16
+    monkeypatch.setattr(session_store.time, "time", lambda: later)
+    assert get_cached_context(state, "token-a", max_age=15) is None
+
+
+class BrokenStore(session_store.SessionStore):
+    def get(self, session_id):
+        raise ConnectionError("redis down")
+
+    def set(self, session_id, state):
+        raise ConnectionError("redis down")
+
+
+def test_store_errors_fall_back_to_empty_session(monkeypatch):
+    monkeypatch.setattr(session_store, "session_store", BrokenStore())
+    assert load_session("s1") == {}
+    save_session("s1", {"turns": 1})  # không raise
+
+
+def test_redis_backend_without_package_falls_back_to_memory(monkeypatch):
+    monkeypatch.setattr(session_store, "CHATBOT_SESSION_BACKEND", "redis")
+    monkeypatch.setitem(sys.modules, "redis", None)
+
+    assert isinstance(session_store.create_session_store(), InMemorySessionStore)
+
+
+def test_predict_works_when_session_store_is_down(monkeypatch):
+    app_module = pytest.importorskip("app")
+    monkeypatch.setattr(session_store, "session_store", BrokenStore())
+    client = app_module.app.test_client()
+
+    response = client.post("/predict", json={"message": "hello", "session_id": "s1"})
+
+    assert response.status_code == 200
+    assert response.get_json()["answer"]
@@ -0,0 +1,98 @@
+import pytest
+
+import utils
+from task_records import compact_context
+
+
+def _context(details, list_name="active"):
+    titles = [detail["title"] for detail in details]
+    return {
+        "tasks": {
+            f"{list_name}Tasks": titles,
+            f"{list_name}TasksCount": len(titles),
+            f"{list_name}TaskDetails": details,
+        }
+    }
+
+
+DETAILS = [
+    {"id": "1", "title": "Không hạn", "priority": "urgent"},
+    {"id": "2", "title": "Tháng 3", "dueDate": "2026-03-01T00:00:00.000Z", "priority": "low"},
+    {"id": "3", "title": "Tháng 1 thấp", "dueDate": "2026-01-10T00:00:00.000Z", "priority": "low"},
+    {"id": "4", "title": "Tháng 2", "dueDate": "2026-02-01T00:00:00.000Z", "priority": "high"},
+    {"id": "5", "title": "Tháng 1 gấp", "dueDate": "2026-01-10T00:00:00.000Z", "priority": "urgent"},
+    {"id": "6", "title": "Tháng 2 khẩn", "dueDate": "2026-02-01T00:00:00.000Z", "priority": "critical"},
+]
+
+
+@pytest.fixture(params=["dict", "record"])
+def context(request):
+    context = _context([dict(detail) for detail in DETAILS])
+    return context if request.param == "dict" else compact_context(context)
+
+
+def test_top_k_by_due_date(context, monkeypatch):
+    monkeypatch.setattr(utils, "CHATBOT_TASK_LIST_ORDER", "dueDate")
+
+    assert utils.format_task_list(context, "all", limit=4) == "\n".join([
+        "- Tháng 1 gấp",
+        "- Tháng 1 thấp",
+        "- Tháng 2 khẩn",
+        "- Tháng 2",
+        "- ... và 2 task khác",
+    ])
+
+
+def test_top_k_by_priority(context, monkeypatch):
+    monkeypatch.setattr(utils, "CHATBOT_TASK_LIST_ORDER", "priority")
+
+    assert utils.format_task_list(context, "all", limit=3) == "\n".join([
+        "- Tháng 1 gấp",
+        "- Không hạn",
+        "- Tháng 2 khẩn",
+        "- ... và 3 task khác",
+    ])
+
+
+def test_list_within_limit_keeps_backend_order(context):
+    expected = "\n".join(f"- {detail['title']}" for detail in DETAILS)
+    assert utils.format_task_list(context, "all", limit=len(DETAILS)) == expected
+    assert utils.format_task_list(context, "all", limit=0) == expected
+
+
+def test_default_limit_comes_from_config(context, monkeypatch):
+    monkeypatch.setattr(utils, "CHATBOT_TASK_LIST_LIMIT", 1)
+    monkeypatch.setattr(utils, "CHATBOT_TASK_LIST_ORDER", "dueDate")
+
+    assert utils.format_task_list(context, "all") == "- Tháng 1 gấp\n- ... và 5 task khác"
+
+
+def test_ties_keep_backend_order(monkeypatch):
+    monkeypatch.setattr(utils, "CHATBOT_TASK_LIST_ORDER", "dueDate")
+    details = [{"id": str(i), "title": f"Task {i}", "dueDate": "2026-05-01"} for i in range(10)]
+
+    assert utils.format_task_list(_context(details), "all", limit=3) == (
+        "- Task 0\n- Task 1\n- Task 2\n- ... và 7 task khác"
+    )
+
+
+def test_mismatched_details_fall_back_to_first_titles():
+    context = _context(DETAILS)
+    context["tasks"]["activeTaskDetails"] = DETAILS[:2]
+
+    assert utils.format_task_list(context, "all", limit=2) == "- Không hạn\n- Tháng 3\n- ... và 4 task khác"
+
+
+@pytest.mark.parametrize("task_type, list_name", [("today", "today"), ("future", "future")])
+def test_today_and_future_lists(task_type, list_name, monkeypatch):
+    monkeypatch.setattr(utils, "CHATBOT_TASK_LIST_ORDER", "dueDate")
+    context = compact_context(_context([dict(detail) for detail in DETAILS], list_name))
+
+    assert utils.format_task_list(context, task_type, limit=1) == "- Tháng 1 gấp\n- ... và 5 task khác"
+
+
+def test_empty_lists():
+    assert utils.format_task_list({"tasks": {}}, "today") == "Hôm nay bạn không có task nào cần hoàn thành."
+    assert utils.format_task_list({"tasks": {}}, "future") == "Hiện tại bạn không có task nào trong tương lai."
+    assert utils.format_task_list({"tasks": {}}, "all") == "Hiện tại bạn không có task nào đang hoạt động."
+    assert utils.format_task_list(None) == ""
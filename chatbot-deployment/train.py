@@ -1,58 +1,27 @@
-import numpy as np
-import random
-import json
-
 import torch
 import torch.nn as nn
 from torch.utils.data import Dataset, DataLoader
 
-from nltk_utils import bag_of_words, tokenize, stem
 from model import NeuralNet
+from preprocess import load_corpus
+
+# tokenize + stem mọi pattern, dùng cache trên đĩa nếu intents.json không đổi
+corpus = load_corpus('intents.json')
+all_words = corpus["all_words"]
+tags = corpus["tags"]
+xy = corpus["xy"]
+X_train = corpus["X_train"]
+y_train = corpus["y_train"]
 
-with open('intents.json', 'r', encoding='utf-8') as f:
-    intents = json.load(f)
-
-all_words = []
-tags = []
-xy = []
-# loop through each sentence in our intents patterns
-for intent in intents['intents']:
-    tag = intent['tag']
-    # add to tag list
-    tags.append(tag)
-    for pattern in intent['patterns']:
-        # tokenize each word in the sentence
-        w = tokenize(pattern)
-        # add to our words list
-        all_words.extend(w)
-        # add to xy pair
-        xy.append((w, tag))
-
-# stem and lower each word
-ignore_words = ['?', '.', '!']
-all_words = [stem(w) for w in all_words if w not in ignore_words]
-# remove duplicates and sort
-all_words = sorted(set(all_words))
-tags = sorted(set(tags))
+if corpus["cache_hit"]:
+    print("loaded preprocessed corpus from cache")
+else:
+    print(corpus["fresh_patterns"], "patterns tokenized (others reused from cache)")
 
 print(len(xy), "patterns")
 print(len(tags), "tags:", tags)
 print(len(all_words), "unique stemmed words:", all_words)
 
-# create training data
-X_train = []
-y_train = []
-for (pattern_sentence, tag) in xy:
-    # X: bag of words for each pattern_sentence
-    bag = bag_of_words(pattern_sentence, all_words)
-    X_train.append(bag)
-    # y: PyTorch CrossEntropyLoss needs only class labels, not one-hot
-    label = tags.index(tag)
-    y_train.append(label)
-
-X_train = np.array(X_train)
-y_train = np.array(y_train)
-
 # Hyper-parameters 
 num_epochs = 1000
 batch_size = 8
@@ -1,14 +1,32 @@
+import heapq
 import logging
+import threading
+from collections import OrderedDict
 from datetime import date
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 
-from config import BACKEND_API_URL, CHATBOT_DEBUG
+from config import (
+    BACKEND_API_URL,
+    CHATBOT_BACKEND_TIMEOUT,
+    CHATBOT_CONTEXT_CACHE_MAX_ENTRIES,
+    CHATBOT_DEBUG,
+    CHATBOT_TASK_LIST_LIMIT,
+    CHATBOT_TASK_LIST_ORDER,
+)
+from resilience import backend_timeout, get_breaker
+from session_store import hash_token
+from task_records import TaskRecord, compact_context, get_task_summary
 
 
 logger = logging.getLogger(__name__)
 
+# Cache context đã parse theo hash token, dùng cho request có điều kiện (ETag/Last-Modified).
+# Mỗi entry: {"etag", "last_modified", "version", "context"}
+_context_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_context_cache_lock = threading.Lock()
+
 
 def _debug_log(message: str, **kwargs: Any) -> None:
     """Log đơn giản khi bật CHATBOT_DEBUG."""
@@ -17,6 +35,44 @@ def _debug_log(message: str, **kwargs: Any) -> None:
         print(f"[CHATBOT_DEBUG] {message}{extra}")
 
 
+def _backend_request(endpoint: str, method: str, url: str, **kwargs: Any) -> Optional[requests.Response]:
+    """
+    Gọi backend qua circuit breaker của endpoint và latency budget của request hiện tại.
+
+    Trả về None (không gọi backend) nếu breaker đang open hoặc budget đã hết.
+    Lỗi kết nối/timeout và 5xx được tính là lỗi cho breaker; exception vẫn được raise lại.
+    Timeout bị latency budget rút ngắn (< CHATBOT_BACKEND_TIMEOUT) không tính là lỗi: endpoint
+    chưa chắc chậm, chỉ là request hiện tại hết thời gian.
+    """
+    timeout = backend_timeout()
+    if timeout is None:
+        _debug_log("Latency budget exhausted, skipping backend call", endpoint=endpoint)
+        return None
+
+    breaker = get_breaker(endpoint)
+    if not breaker.allow_request():
+        _debug_log("Circuit breaker open, skipping backend call", endpoint=endpoint)
+        return None
+
+    try:
+        resp = requests.request(method, url, timeout=timeout, **kwargs)
+    except requests.Timeout:
+        if timeout < CHATBOT_BACKEND_TIMEOUT:
+            breaker.release_trial()
+        else:
+            breaker.record_failure()
+        raise
+    except requests.RequestException:
+        breaker.record_failure()
+        raise
+
+    if resp.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return resp
+
+
 def get_user_context(token: Optional[str]) -> Optional[Dict[str, Any]]:
     """
     Gọi backend để lấy context cho chatbot.
@@ -33,12 +89,30 @@ def get_user_context(token: Optional[str]) -> Optional[Dict[str, Any]]:
         "Authorization": f"Bearer {token}",
         "Accept": "application/json",
     }
+    params = {}
+
+    cache_key = hash_token(token)
+    cached = _get_context_cache_entry(cache_key)
+    if cached:
+        # Request có điều kiện: backend trả 304 nếu context không đổi
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+        # Backend hỗ trợ delta sẽ chỉ trả các phần task thay đổi kể từ version này
+        if cached.get("version") is not None:
+            params["since"] = cached["version"]
 
     try:
-        _debug_log("Fetching chatbot context from backend", url=url)
-        resp = requests.get(url, headers=headers, timeout=5)
+        _debug_log("Fetching chatbot context from backend", url=url, conditional=bool(cached))
+        resp = _backend_request("context", "GET", url, headers=headers, params=params or None)
+        if resp is None:
+            return None
         _debug_log("Backend context response", status=resp.status_code)
 
+        if resp.status_code == 304 and cached:
+            return cached["context"]
+
         if resp.status_code != 200:
             logger.warning(
                 "Failed to fetch chatbot context: %s %s",
@@ -53,19 +127,112 @@ def get_user_context(token: Optional[str]) -> Optional[Dict[str, Any]]:
         if not context:
             context = data
 
+        if cached and isinstance(context, dict) and context.get("delta"):
+            context = _merge_context_delta(cached["context"], context)
+
+        # Task details -> TaskRecord dùng chung + id set/status count tính sẵn
+        context = compact_context(context)
+
+        _store_context_cache_entry(
+            cache_key,
+            {
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "version": context.get("version") if isinstance(context, dict) else None,
+                "context": context,
+            },
+        )
         return context
     except Exception as exc:  # pylint: disable=broad-except
         logger.exception("Error while fetching chatbot context: %s", exc)
         return None
 
 
-def format_task_list(context: Optional[Dict[str, Any]], task_type: str = "all") -> str:
+def _get_context_cache_entry(cache_key: str) -> Optional[Dict[str, Any]]:
+    with _context_cache_lock:
+        entry = _context_cache.get(cache_key)
+        if entry is not None:
+            _context_cache.move_to_end(cache_key)
+        return entry
+
+
+def _store_context_cache_entry(cache_key: str, entry: Dict[str, Any]) -> None:
+    if not entry.get("etag") and not entry.get("last_modified") and entry.get("version") is None:
+        # Backend không hỗ trợ request có điều kiện, không cần giữ lại
+        return
+    with _context_cache_lock:
+        _context_cache[cache_key] = entry
+        _context_cache.move_to_end(cache_key)
+        while len(_context_cache) > CHATBOT_CONTEXT_CACHE_MAX_ENTRIES:
+            _context_cache.popitem(last=False)
+
+
+def _merge_context_delta(base: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Ghép delta từ backend vào context đã cache.
+    Delta chỉ chứa các field thay đổi; riêng "tasks" được ghép theo từng field
+    (vd chỉ có todayTasks/todayTaskDetails thay đổi).
+    """
+    merged = dict(base)
+    for key, value in delta.items():
+        if key == "delta":
+            continue
+        if key == "tasks" and isinstance(value, dict):
+            tasks = dict(base.get("tasks") or {})
+            tasks.update(value)
+            merged["tasks"] = tasks
+        else:
+            merged[key] = value
+    return merged
+
+
+# Thứ tự ưu tiên khi chọn task hiển thị (nhỏ hơn = quan trọng hơn), theo PRIORITY_LEVELS của backend
+_PRIORITY_RANK = {"urgent": 0, "critical": 1, "high": 2, "medium": 3, "low": 4}
+
+
+def _select_task_titles(titles: List[str], details: List[Any], limit: int, order: str) -> List[str]:
+    """
+    Chọn tối đa limit title theo dueDate (hoặc priority) bằng heap, không sort toàn bộ.
+    Nếu details không khớp với titles thì lấy limit title đầu tiên.
+    """
+    if len(details) != len(titles):
+        return titles[:limit]
+
+    # Đọc thẳng attribute của TaskRecord (nhanh hơn .get() khi có hàng nghìn task)
+    due_dates = [
+        detail.dueDate if type(detail) is TaskRecord else detail.get("dueDate")  # pylint: disable=unidiomatic-typecheck
+        for detail in details
+    ]
+    priorities = [
+        detail.priority if type(detail) is TaskRecord else detail.get("priority")  # pylint: disable=unidiomatic-typecheck
+        for detail in details
+    ]
+
+    # Chuỗi ISO so sánh được theo thứ tự thời gian; task không có dueDate xếp cuối
+    no_rank = len(_PRIORITY_RANK)
+    ranks = [_PRIORITY_RANK.get(priority, no_rank) for priority in priorities]
+    due_keys = [due_date or "\uffff" for due_date in due_dates]
+    if order == "priority":
+        keys = zip(ranks, due_keys, range(len(titles)))
+    else:
+        keys = zip(due_keys, ranks, range(len(titles)))
+    return [titles[key[2]] for key in heapq.nsmallest(limit, keys)]
+
+
+def format_task_list(
+    context: Optional[Dict[str, Any]],
+    task_type: str = "all",
+    limit: Optional[int] = None,
+) -> str:
     """
     Format danh sách task từ context thành 1 chuỗi đẹp.
     
     Args:
         context: Context từ backend
         task_type: "all" (tất cả), "today" (chỉ hôm nay), "future" (chỉ tương lai)
+        limit: số task tối đa hiển thị (mặc định CHATBOT_TASK_LIST_LIMIT, <= 0 là không giới hạn).
+            Khi vượt quá, chọn các task gần hạn nhất (hoặc ưu tiên cao nhất theo
+            CHATBOT_TASK_LIST_ORDER) và thêm dòng "... và N task khác".
     """
     if not context:
         return ""
@@ -74,19 +241,32 @@ def format_task_list(context: Optional[Dict[str, Any]], task_type: str = "all")
     
     if task_type == "today":
         active_tasks = tasks_info.get("todayTasks") or []
+        details = tasks_info.get("todayTaskDetails") or []
         if not active_tasks:
             return "Hôm nay bạn không có task nào cần hoàn thành."
     elif task_type == "future":
         active_tasks = tasks_info.get("futureTasks") or []
+        details = tasks_info.get("futureTaskDetails") or []
         if not active_tasks:
             return "Hiện tại bạn không có task nào trong tương lai."
     else:
         active_tasks = tasks_info.get("activeTasks") or []
+        details = tasks_info.get("activeTaskDetails") or []
         if not active_tasks:
             return "Hiện tại bạn không có task nào đang hoạt động."
 
+    if limit is None:
+        limit = CHATBOT_TASK_LIST_LIMIT
+
+    remaining = 0
+    if 0 < limit < len(active_tasks):
+        remaining = len(active_tasks) - limit
+        active_tasks = _select_task_titles(active_tasks, details, limit, CHATBOT_TASK_LIST_ORDER)
+
     # Dạng bullet list
     lines = [f"- {title}" for title in active_tasks]
+    if remaining:
+        lines.append(f"- ... và {remaining} task khác")
     return "\n".join(lines)
 
 
@@ -122,7 +302,7 @@ def has_special_day_today() -> bool:
     return bool(get_today_special_day_label())
 
 
-def _fetch_json_with_auth(url: str, token: Optional[str]) -> Optional[Dict[str, Any]]:
+def _fetch_json_with_auth(endpoint: str, url: str, token: Optional[str]) -> Optional[Dict[str, Any]]:
     """Helper: gọi GET JSON với Bearer token, trả về data.get('data')."""
     if not token:
         return None
@@ -134,7 +314,9 @@ def _fetch_json_with_auth(url: str, token: Optional[str]) -> Optional[Dict[str,
 
     try:
         _debug_log("Fetching JSON with auth", url=url)
-        resp = requests.get(url, headers=headers, timeout=5)
+        resp = _backend_request(endpoint, "GET", url, headers=headers)
+        if resp is None:
+            return None
         _debug_log("JSON with auth response", status=resp.status_code)
 
         if resp.status_code != 200:
@@ -160,7 +342,7 @@ def get_group_progress(token: Optional[str]) -> Optional[Dict[str, Any]]:
     }
     """
     url = f"{BACKEND_API_URL}/chatbot/group-progress"
-    return _fetch_json_with_auth(url, token)
+    return _fetch_json_with_auth("group-progress", url, token)
 
 
 def get_member_progress(token: Optional[str], member_id: str) -> Optional[Dict[str, Any]]:
@@ -170,24 +352,31 @@ def get_member_progress(token: Optional[str], member_id: str) -> Optional[Dict[s
     if not member_id:
         return None
     url = f"{BACKEND_API_URL}/chatbot/member-progress?memberId={member_id}"
-    return _fetch_json_with_auth(url, token)
+    return _fetch_json_with_auth("member-progress", url, token)
 
 
-def save_recommended_tasks(token: Optional[str], context: Optional[Dict[str, Any]]) -> None:
+def get_future_task_ids(context: Optional[Dict[str, Any]]) -> List[str]:
+    """Lấy danh sách id của các task tương lai (futureTaskDetails) trong context."""
+    if not context:
+        return []
+
+    return list(get_task_summary(context).ordered_ids["future"])
+
+
+def save_recommended_tasks(token: Optional[str], context: Optional[Dict[str, Any]]) -> bool:
     """
     Gửi danh sách task được đề xuất gần nhất lên backend để lưu lại cho user hiện tại.
     Chỉ lấy task có dueDate ở tương lai (futureTaskDetails).
+    Trả về True nếu backend đã lưu thành công.
     """
     if not token or not context:
-        return
+        return False
 
-    tasks_info = context.get("tasks") or {}
     # Chỉ lấy task tương lai cho recommended tasks
-    details = tasks_info.get("futureTaskDetails") or []
-    task_ids = [item.get("id") for item in details if item.get("id")]
+    task_ids = get_future_task_ids(context)
 
     if not task_ids:
-        return
+        return False
 
     url = f"{BACKEND_API_URL}/chatbot/recommended-tasks"
     headers = {
@@ -198,10 +387,16 @@ def save_recommended_tasks(token: Optional[str], context: Optional[Dict[str, Any
 
     try:
         _debug_log("Saving recommended tasks (future only)", count=len(task_ids))
-        resp = requests.post(url, headers=headers, json={"taskIds": task_ids}, timeout=5)
+        resp = _backend_request(
+            "recommended-tasks", "POST", url, headers=headers, json={"taskIds": task_ids}
+        )
+        if resp is None:
+            return False
         _debug_log("Save recommended tasks response", status=resp.status_code)
+        return 200 <= resp.status_code < 300
     except Exception as exc:  # pylint: disable=broad-except
         logger.exception("Error while saving recommended tasks: %s", exc)
+        return False
 
 
 def evaluate_recommended_tasks(token: Optional[str]) -> Optional[Dict[str, Any]]:
@@ -223,7 +418,9 @@ def evaluate_recommended_tasks(token: Optional[str]) -> Optional[Dict[str, Any]]
 
     try:
         _debug_log("Evaluating recommended tasks")
-        resp = requests.get(url, headers=headers, timeout=5)
+        resp = _backend_request("recommended-tasks/evaluate", "GET", url, headers=headers)
+        if resp is None:
+            return None
         _debug_log("Evaluate recommended tasks response", status=resp.status_code)
 
         if resp.status_code != 200:
@@ -247,12 +444,14 @@ def evaluate_future_tasks_status(context: Optional[Dict[str, Any]]) -> Dict[str,
     - has_future_tasks: True nếu có task tương lai
     - future_tasks_count: Số lượng task tương lai
     - future_task_details: Danh sách chi tiết task tương lai
+    - completed_future_tasks_count: Số task tương lai đã completed
     """
     if not context:
         return {
             "has_future_tasks": False,
             "future_tasks_count": 0,
-            "future_task_details": []
+            "future_task_details": [],
+            "completed_future_tasks_count": 0,
         }
     
     tasks_info = context.get("tasks") or {}
@@ -262,7 +461,8 @@ def evaluate_future_tasks_status(context: Optional[Dict[str, Any]]) -> Dict[str,
     return {
         "has_future_tasks": future_tasks_count > 0,
         "future_tasks_count": future_tasks_count,
-        "future_task_details": future_task_details
+        "future_task_details": future_task_details,
+        "completed_future_tasks_count": get_task_summary(context).count_status("future", "completed"),
     }
 
 
@@ -312,11 +512,11 @@ def replace_placeholders(template: str, context: Optional[Dict[str, Any]]) -> st
     - {activeTasks}, {activeTasksCount}
     - {current_date}, {current_date_vn}
     - {special_day} (tự xác định theo ngày hiện tại)
+
+    Nếu không có context (không có token, backend lỗi hoặc bị circuit breaker chặn)
+    thì vẫn render template với giá trị mặc định thay vì để lộ placeholder.
     """
-    if not context:
-        # Vẫn xử lý {special_day} nếu không có context
-        special_day = get_today_special_day_label()
-        return template.replace("{special_day}", special_day)
+    context = context or {}
 
     user = context.get("user") or {}
     tasks = context.get("tasks") or {}
@@ -333,10 +533,10 @@ def replace_placeholders(template: str, context: Optional[Dict[str, Any]]) -> st
     today_tasks_count = tasks.get("todayTasksCount") or 0
     future_tasks_count = tasks.get("futureTasksCount") or 0
 
-    # Chuỗi mô tả danh sách task
-    active_tasks_str = format_task_list(context, "all")
-    today_tasks_str = format_task_list(context, "today")
-    future_tasks_str = format_task_list(context, "future")
+    # Chuỗi mô tả danh sách task, chỉ render khi template có dùng
+    active_tasks_str = format_task_list(context, "all") if "{activeTasks}" in template else ""
+    today_tasks_str = format_task_list(context, "today") if "{todayTasks}" in template else ""
+    future_tasks_str = format_task_list(context, "future") if "{futureTasks}" in template else ""
 
     mapping = {
         "user_name": full_name,